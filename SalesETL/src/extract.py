@@ -1,7 +1,9 @@
 import os
 import pandas as pd
+from instrumentation import instrument_stage
 
 
+@instrument_stage('sales', 'extract')
 def extract(file_path):
     if not os.path.exists(file_path):
         raise FileNotFoundError("No File Founded")   
@@ -3,6 +3,7 @@ import pandas as pd
 import configparser
 from azure.storage.blob import BlobServiceClient
 import io
+from instrumentation import instrument_stage
 
 # Load configuration
 config = configparser.ConfigParser(interpolation=None)
@@ -19,6 +20,7 @@ CONTAINER_NAME = config['azure']['CONTAINER_NAME']
 SAS_TOKEN = config['azure']['SAS_TOKEN']
 
 # Functions
+@instrument_stage('sales', 'load_sales_data')
 def load_sales_data(clean_data: pd.DataFrame):
     """
     Load cleaned sales data to the database.
@@ -30,6 +32,7 @@ def load_sales_data(clean_data: pd.DataFrame):
         print(f"Error loading sales data to database: {e}")
 
 
+@instrument_stage('sales', 'load_agg_data')
 def load_agg_data(agg_data: pd.DataFrame):
     """
     Load aggregated sales data (yearly and monthly) to the database.
@@ -41,6 +44,7 @@ def load_agg_data(agg_data: pd.DataFrame):
         print(f"Error loading aggregated data to database: {e}")
 
 
+@instrument_stage('sales', 'load_to_azure')
 def load_to_azure(df: pd.DataFrame,blob_name:str):
     """
     Load a pandas DataFrame to Azure Blob Storage as a CSV file.
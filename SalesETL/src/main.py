@@ -1,3 +1,4 @@
+from instrumentation import write_prometheus
 from extract import extract
 from transfrom import transform_clean_data,transform_agg_monthly_sales
 from load import load_agg_data,load_sales_data,load_to_azure
@@ -13,4 +14,6 @@ agg_data = transform_agg_monthly_sales(clean_data)
 
 load_sales_data(clean_data)
 load_agg_data(agg_data)
-load_to_azure(agg_data,"yearly_monthly_sales.csv")
\ No newline at end of file
+load_to_azure(agg_data,"yearly_monthly_sales.csv")
+
+write_prometheus()
\ No newline at end of file
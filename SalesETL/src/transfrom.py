@@ -1,6 +1,8 @@
 import pandas as pd
+from instrumentation import instrument_stage
 
 
+@instrument_stage('sales', 'transform_clean_data')
 def transform_clean_data(raw_data):
     clean_data = raw_data.dropna()
     
@@ -19,6 +21,7 @@ def transform_clean_data(raw_data):
 
     return clean_data
 
+@instrument_stage('sales', 'transform_agg_monthly_sales')
 def transform_agg_monthly_sales(clean_data):
     selected_columns = ['month','year','weekly_sales']
     agg_data_initial = clean_data.loc[:,selected_columns]
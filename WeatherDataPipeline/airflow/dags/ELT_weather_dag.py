@@ -3,13 +3,12 @@ Weather Data ETL DAG
 This DAG performs hourly ETL operations on weather data:
 1. Extracts weather data from API for specified cities
 2. Transforms the data with additional metrics
-3. Loads the transformed data to a CSV file
+3. Loads the transformed data to the configured sinks (CSV, partitioned Parquet, Postgres)
 """
 
 import os
 import sys
 import logging
-import pandas as pd
 from datetime import datetime, timedelta
 
 from airflow import DAG
@@ -19,9 +18,9 @@ from airflow.operators.python import PythonOperator
 PROJECT_ROOT = '/media/sorour/8fe1c1c7-b574-4c1a-bf0c-dd93e66cb530/projects/DataEngineeringProjects/WeatherDataPipeline'
 sys.path.append(PROJECT_ROOT)
 
+from instrumentation import write_prometheus
 from utils.database import Database
 from utils.config import Config
-from utils.etl import extract, transform, load
 
 # Configure logging
 logging.basicConfig(
@@ -40,16 +39,20 @@ DEFAULT_ARGS = {
     'retry_delay': timedelta(minutes=5)
 }
 
-# Initialize configuration and database connection
-def init_resources():
-    """Initialize and return configuration and database connection."""
-    config_path = os.path.join(PROJECT_ROOT, 'config.yaml')
-    config = Config(config_path).config
-    database = Database(config=config)
-    database.test_connection()
-    return config, database
+# Configuration and database handles are created lazily inside task execution,
+# so parsing this DAG never reads config.yaml or opens database connections.
+# The ETL and storage modules (pandas, requests) are likewise imported inside the tasks.
+_resources = None
 
-config, database = init_resources()
+def init_resources():
+    """Initialize (once per process) and return configuration and database handle."""
+    global _resources
+    if _resources is None:
+        config_path = os.path.join(PROJECT_ROOT, 'config.yaml')
+        config = Config(config_path).config
+        database = Database(config=config)
+        _resources = (config, database)
+    return _resources
 
 # Task functions
 def extract_task(**context):
@@ -60,6 +63,10 @@ def extract_task(**context):
         context: Airflow context dictionary
     """
     try:
+        from utils.etl import extract
+        from utils.partitions import maintain_staging_partitions
+        config, database = init_resources()
+        maintain_staging_partitions(config, database)
         cities = config['CITIES']
         extraction_timestamp = extract(cities=cities, config=config, database=database)
         logger.info(f"Extraction completed with timestamp: {extraction_timestamp}")
@@ -67,6 +74,9 @@ def extract_task(**context):
     except Exception as e:
         logger.error(f"Error in extract task: {str(e)}")
         raise
+    finally:
+        # Per-stage timings of this task process (PIPELINE_METRICS_PROM)
+        write_prometheus()
 
 def transform_task(**context):
     """
@@ -76,6 +86,9 @@ def transform_task(**context):
         context: Airflow context dictionary
     """
     try:
+        from utils.etl import transform
+        from utils.storage import write_intermediate
+        config, database = init_resources()
         ti = context['ti']
         extraction_timestamp = ti.xcom_pull(task_ids='extract_task', key='extraction_timestamp')
         logger.info(f"Transform task received timestamp: {extraction_timestamp}")
@@ -83,31 +96,46 @@ def transform_task(**context):
         transformed_df = transform(extraction_timestamp=extraction_timestamp, database=database)
         logger.info(f"Transformed data shape: {transformed_df.shape}")
         
-        ti.xcom_push(key='transformed_data', value=transformed_df.to_json())
+        # Only a small file reference goes through XCom; the data itself is Parquet
+        reference = write_intermediate(transformed_df, config, context['run_id'], 'transform_task')
+        ti.xcom_push(key='transformed_data', value=reference)
     except Exception as e:
         logger.error(f"Error in transform task: {str(e)}")
         raise
+    finally:
+        # Per-stage timings of this task process (PIPELINE_METRICS_PROM)
+        write_prometheus()
 
 def load_task(**context):
     """
-    Load transformed data to CSV file.
+    Load transformed data to the configured sinks (CSV, Parquet dataset, Postgres).
     
     Args:
         context: Airflow context dictionary
     """
     try:
+        from utils.sinks import write_sinks
+        from utils.storage import read_intermediate, delete_intermediate
+        config, database = init_resources()
         ti = context['ti']
-        transformed_df = ti.xcom_pull(task_ids='transform_task', key='transformed_data')
-        output_path = config['PATHS']['ETL_OUTPUT_PATH']
+        reference = ti.xcom_pull(task_ids='transform_task', key='transformed_data')
+        sinks = (config.get('SINKS') or {}).get('ENABLED', ['csv'])
         
-        logger.info(f"Loading data to: {output_path}")
-        df = pd.read_json(transformed_df)
+        logger.info(f"Loading data to sinks: {sinks}")
+        df = read_intermediate(reference, config)
         logger.info(f"Data to be loaded shape: {df.shape}")
         
-        load(df=df, output_path=output_path)
+        write_sinks(df=df, config=config, database=database)
+        if (config.get('ANALYTICS') or {}).get('ENABLED', False):
+            from utils.rolling import update_rolling_analytics
+            update_rolling_analytics(df, config)
+        delete_intermediate(reference, config)
     except Exception as e:
         logger.error(f"Error in load task: {str(e)}")
         raise
+    finally:
+        # Per-stage timings of this task process (PIPELINE_METRICS_PROM)
+        write_prometheus()
 
 # DAG definition
 dag = DAG(
@@ -0,0 +1 @@
+# Puts the project root on sys.path so tests can import the utils package.
@@ -0,0 +1,29 @@
+-- Staging table for raw API responses, range-partitioned by day on extraction_timestamp.
+-- Daily partitions are created ahead of time and dropped after the retention
+-- window by utils/partitions.py.
+CREATE TABLE IF NOT EXISTS stagging_weather_data (
+    city VARCHAR(100) NOT NULL,
+    temperature DOUBLE PRECISION,
+    feels_like DOUBLE PRECISION,
+    humidity INTEGER,
+    pressure INTEGER,
+    description VARCHAR(200),
+    wind_speed DOUBLE PRECISION,
+    timestamp TIMESTAMP,
+    dt BIGINT,
+    extraction_timestamp TIMESTAMP NOT NULL
+) PARTITION BY RANGE (extraction_timestamp);
+
+-- Catches rows whose daily partition has not been created yet
+CREATE TABLE IF NOT EXISTS stagging_weather_data_default
+    PARTITION OF stagging_weather_data DEFAULT;
+
+-- Lookup index used by transform(); created on every partition
+CREATE INDEX IF NOT EXISTS stagging_weather_data_extraction_idx
+    ON stagging_weather_data (extraction_timestamp);
+
+-- Migrating an existing, unpartitioned staging table:
+--   ALTER TABLE stagging_weather_data RENAME TO stagging_weather_data_old;
+--   (run this file, then utils.partitions.ensure_daily_partitions for the history range)
+--   INSERT INTO stagging_weather_data SELECT * FROM stagging_weather_data_old;
+--   DROP TABLE stagging_weather_data_old;
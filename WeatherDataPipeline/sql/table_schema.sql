@@ -22,3 +22,7 @@ CREATE TABLE IF NOT EXISTS processed_weather_data (
     CONSTRAINT humidity_range CHECK (humidity BETWEEN 0 AND 100),
     CONSTRAINT hour_range CHECK (hour BETWEEN 0 AND 23)
 );
+
+-- Natural key used by the idempotent bulk upserts in utils/sinks.py
+CREATE UNIQUE INDEX IF NOT EXISTS processed_weather_data_city_event_idx
+    ON processed_weather_data (city, event_timestamp);
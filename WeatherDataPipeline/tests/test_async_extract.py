@@ -0,0 +1,115 @@
+import time
+import random
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from aiohttp.test_utils import TestServer
+
+from utils.async_extract import TokenBucket, _backoff_delay, fetch_all_async
+from utils.stub_server import create_app
+
+CITIES = [f'City {i}' for i in range(12)]
+
+
+class FakeStagingWriter:
+    """Collects records in memory in place of utils.staging.StagingWriter."""
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, record):
+        self.records.append(record)
+
+
+def run_extract(app, cities, **app_config):
+    """Run fetch_all_async against the stub app; return (written, writer, response statuses, seconds)."""
+    statuses = []
+
+    async def record_status(request, response):
+        statuses.append(response.status)
+
+    app.on_response_prepare.append(record_status)
+
+    async def main():
+        async with TestServer(app) as server:
+            config = {'APP': {
+                'API_KEY': 'test',
+                'URL': str(server.make_url('/data/2.5/weather')),
+                'MAX_CONCURRENCY': 10,
+                'BACKOFF_BASE': 0.01,
+                'TIMEOUT': 5,
+                **app_config,
+            }}
+            writer = FakeStagingWriter()
+            start = time.monotonic()
+            written = await fetch_all_async(cities, config, datetime.now(), writer)
+            return written, writer, statuses, time.monotonic() - start
+
+    return asyncio.run(main())
+
+
+def test_token_bucket_limits_rate_after_burst():
+    async def acquire_all(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # One token is available up front; the other four arrive at 20 per second
+    elapsed = asyncio.run(acquire_all(TokenBucket(rate=20, capacity=1), 5))
+    assert elapsed >= 4 / 20 * 0.9
+
+
+def test_backoff_honours_retry_after():
+    assert _backoff_delay(3, 1.0, '2') == 2.0
+    assert 0 <= _backoff_delay(3, 1.0, 'not-a-number') <= 8.0
+    assert all(0 <= _backoff_delay(2, 0.5) <= 2.0 for _ in range(100))
+
+
+def test_throughput_is_bounded_by_quota():
+    # 1200 requests per minute is 20 per second with a burst of 20
+    cities = [f'City {i}' for i in range(40)]
+    written, writer, statuses, elapsed = run_extract(create_app(), cities, RATE_LIMIT_PER_MINUTE=1200)
+
+    assert written == len(cities)
+    assert sorted(r['city'] for r in writer.records) == sorted(cities)
+    assert statuses == [200] * len(cities)
+    assert elapsed >= (len(cities) - 20) / 20 * 0.9
+
+
+def test_requests_overlap_instead_of_running_serially():
+    # With a generous quota, 20 requests of 0.2s each must not take 20 * 0.2s
+    cities = [f'City {i}' for i in range(20)]
+    written, writer, statuses, elapsed = run_extract(
+        create_app(latency=0.2), cities, RATE_LIMIT_PER_MINUTE=6000, MAX_CONCURRENCY=10)
+
+    assert written == len(cities)
+    assert statuses == [200] * len(cities)
+    # Two waves of ten concurrent requests, far below the serial 4 seconds
+    assert elapsed < len(cities) * 0.2 / 4
+
+
+def test_retries_server_errors_with_backoff():
+    random.seed(7)
+    written, writer, statuses, _ = run_extract(
+        create_app(failure_rate=0.3), CITIES, RATE_LIMIT_PER_MINUTE=6000, MAX_RETRIES=10)
+
+    assert written == len(CITIES)
+    assert 503 in statuses
+    assert statuses.count(200) == len(CITIES)
+
+
+def test_retries_rate_limited_requests_after_retry_after():
+    # The server allows 5 requests per second; the client quota is far higher
+    app = create_app(rate_limit_per_minute=5, rate_limit_window=1.0)
+    written, writer, statuses, elapsed = run_extract(app, CITIES, RATE_LIMIT_PER_MINUTE=6000, MAX_RETRIES=5)
+
+    assert written == len(CITIES)
+    assert 429 in statuses
+    assert statuses.count(200) == len(CITIES)
+    # 12 requests at 5 per window need two Retry-After waits of at least one second
+    assert elapsed >= 2.0
@@ -0,0 +1,130 @@
+import os
+import math
+import statistics
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from utils.rolling import RollingWindow, RollingWeatherAnalytics, update_rolling_analytics
+
+HOUR = 3600
+DAY = 24 * HOUR
+T0 = 1738355104
+
+
+def batch(city, rows, start=T0):
+    """Build a processed-data batch of (hours offset, temperature, severity) rows."""
+    return pd.DataFrame({
+        'city': city,
+        'event_timestamp': pd.to_datetime([start + h * HOUR for h, _, _ in rows], unit='s'),
+        'temperature': [t for _, t, _ in rows],
+        'weather_severity': [s for _, _, s in rows],
+    })
+
+
+def test_window_evicts_expired_observations():
+    window = RollingWindow(span=2 * HOUR)
+    window.add(T0, 10.0, 0.1)
+    window.add(T0 + HOUR, 20.0, 0.2)
+    window.add(T0 + 2 * HOUR, 30.0, 0.3)
+
+    stats = window.stats()
+    assert window.n == 2
+    assert stats['temp_mean'] == pytest.approx(25.0)
+    assert stats['temp_min'] == 20.0
+    assert stats['temp_max'] == 30.0
+
+
+def test_monotonic_deques_track_sliding_min_and_max():
+    window = RollingWindow(span=3 * HOUR)
+    temperatures = [5.0, 9.0, 1.0, 7.0, 3.0, 8.0, 2.0, 6.0]
+    for i, temperature in enumerate(temperatures):
+        window.add(T0 + i * HOUR, temperature, 0.5)
+        inside = temperatures[max(0, i - 2):i + 1]
+        assert window.stats()['temp_min'] == min(inside)
+        assert window.stats()['temp_max'] == max(inside)
+
+
+def test_zscore_is_scored_against_prior_window():
+    window = RollingWindow(span=DAY)
+    for i, temperature in enumerate([10.0, 12.0, 14.0]):
+        window.add(T0 + i * HOUR, temperature, 0.5)
+
+    expected = (20.0 - 12.0) / statistics.stdev([10.0, 12.0, 14.0])
+    assert window.zscore(20.0) == pytest.approx(expected)
+    assert math.isnan(RollingWindow(span=DAY).zscore(20.0))
+
+
+def test_severity_trend_is_slope_per_hour():
+    window = RollingWindow(span=DAY)
+    for i in range(5):
+        window.add(T0 + i * HOUR, 10.0, 0.1 + 0.05 * i)
+    assert window.stats()['severity_trend'] == pytest.approx(0.05)
+
+
+def test_add_rejects_non_finite_values():
+    window = RollingWindow(span=DAY)
+    with pytest.raises(ValueError):
+        window.add(T0, float('nan'), 0.5)
+    assert window.n == 0
+
+
+def test_update_drops_nan_rows_without_corrupting_state():
+    analytics = RollingWeatherAnalytics()
+    result = analytics.update(batch('Cairo', [(0, 10.0, 0.1), (1, float('nan'), 0.2), (2, 12.0, 0.3), (3, 14.0, 0.4)]))
+
+    assert len(result) == 3
+    assert result['temp_mean_24h'].tolist() == pytest.approx([10.0, 11.0, 12.0])
+    assert result['temp_max_24h'].tolist() == [10.0, 12.0, 14.0]
+
+
+def test_update_skips_rerun_observations():
+    analytics = RollingWeatherAnalytics()
+    first = batch('Cairo', [(0, 10.0, 0.1), (1, 12.0, 0.2)])
+    analytics.update(first)
+
+    rerun = analytics.update(pd.concat([first, batch('Cairo', [(2, 14.0, 0.3)])]))
+    assert len(rerun) == 1
+    assert rerun['temp_mean_24h'].iloc[0] == pytest.approx(12.0)
+    assert analytics.state['Cairo']['windows']['24h'].n == 3
+
+
+def test_state_survives_save_and_load(tmp_path):
+    path = str(tmp_path / 'state.json')
+    analytics = RollingWeatherAnalytics()
+    analytics.update(batch('Cairo', [(0, 10.0, 0.1), (1, 12.0, 0.2)]))
+    analytics.update(batch('Giza', [(0, 20.0, 0.5)]))
+    analytics.save(path)
+
+    restored = RollingWeatherAnalytics.load(path)
+    for city in ('Cairo', 'Giza'):
+        for name in ('24h', '7d'):
+            assert restored.state[city]['windows'][name].stats() == pytest.approx(
+                analytics.state[city]['windows'][name].stats(), nan_ok=True)
+
+    continued = restored.update(batch('Cairo', [(2, 14.0, 0.3)]))
+    assert continued['temp_mean_24h'].iloc[0] == pytest.approx(12.0)
+
+
+def test_load_starts_empty_when_windows_change(tmp_path):
+    path = str(tmp_path / 'state.json')
+    analytics = RollingWeatherAnalytics()
+    analytics.update(batch('Cairo', [(0, 10.0, 0.1)]))
+    analytics.save(path)
+
+    assert RollingWeatherAnalytics.load(path, windows={'1h': HOUR}).state == {}
+
+
+def test_update_rolling_analytics_compacts_touched_partitions(tmp_path):
+    pytest.importorskip('pyarrow')
+    rolling_path = str(tmp_path / 'rolling')
+    config = {'ANALYTICS': {'ROLLING_PATH': rolling_path, 'STATE_PATH': str(tmp_path / 'state.json')}}
+    for hour in (0, 1, 2):
+        update_rolling_analytics(batch('Cairo', [(hour, 10.0 + hour, 0.1)]), config)
+
+    # The batches fall on a closed (past) day, so its partition is merged into one file
+    [date_dir] = os.listdir(rolling_path)
+    partition = os.path.join(rolling_path, date_dir, 'city=Cairo')
+    assert len([f for f in os.listdir(partition) if f.endswith('.parquet')]) == 1
+    assert len(pd.read_parquet(rolling_path)) == 3
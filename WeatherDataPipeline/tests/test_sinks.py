@@ -0,0 +1,74 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('pyarrow')
+pytest.importorskip('fsspec')
+
+from utils.sinks import batch_partitions, compact_partitions, write_parquet_dataset
+
+TODAY = date.today()
+
+
+def batch(day, cities, hour=12):
+    return pd.DataFrame({
+        'city': cities,
+        'event_timestamp': pd.to_datetime([f'{day.isoformat()} {hour:02d}:00'] * len(cities)),
+        'temperature': [20.0] * len(cities),
+    })
+
+
+def parquet_files(base_path, day, city_dir):
+    partition = os.path.join(base_path, f'date={day.isoformat()}', f'city={city_dir}')
+    return [f for f in os.listdir(partition) if f.endswith('.parquet')]
+
+
+def test_batch_partitions_include_previous_day():
+    assert batch_partitions(batch(TODAY, ['Oslo', 'New York'])) == {
+        (TODAY.isoformat(), 'Oslo'),
+        (TODAY.isoformat(), 'New York'),
+        ((TODAY - timedelta(days=1)).isoformat(), 'Oslo'),
+        ((TODAY - timedelta(days=1)).isoformat(), 'New York'),
+    }
+
+
+def test_compacts_only_partitions_touched_by_batch(tmp_path):
+    base_path = str(tmp_path)
+    yesterday, old = TODAY - timedelta(days=1), TODAY - timedelta(days=10)
+    for hour in (10, 11):
+        write_parquet_dataset(batch(yesterday, ['New York'], hour), base_path)
+        write_parquet_dataset(batch(old, ['New York'], hour), base_path)
+
+    current = batch(TODAY, ['New York'])
+    write_parquet_dataset(current, base_path)
+    compacted = compact_partitions(base_path, batch_partitions(current), min_files=24)
+
+    # Yesterday's closed partition is compacted; the old one is outside the batch window
+    assert compacted == 1
+    assert len(parquet_files(base_path, yesterday, 'New%20York')) == 1
+    assert len(parquet_files(base_path, old, 'New%20York')) == 2
+    assert len(pd.read_parquet(base_path, filters=[('date', '=', yesterday.isoformat())])) == 2
+
+
+def test_full_scan_when_no_partitions_given(tmp_path):
+    base_path = str(tmp_path)
+    old = TODAY - timedelta(days=10)
+    for hour in (10, 11):
+        write_parquet_dataset(batch(old, ['Oslo'], hour), base_path)
+
+    assert compact_partitions(base_path) == 1
+    assert len(parquet_files(base_path, old, 'Oslo')) == 1
+
+
+def test_rewriting_a_batch_does_not_duplicate_rows(tmp_path):
+    base_path = str(tmp_path)
+    df = batch(TODAY, ['Oslo', 'New York'])
+    write_parquet_dataset(df, base_path)
+    # A task retry writes the same batch again
+    write_parquet_dataset(df, base_path)
+    write_parquet_dataset(batch(TODAY - timedelta(days=1), ['Oslo']), base_path)
+
+    assert len(pd.read_parquet(base_path)) == 3
+    assert len(parquet_files(base_path, TODAY, 'Oslo')) == 1
@@ -0,0 +1,231 @@
+"""
+Asynchronous Weather Data Extraction
+This module contains the asyncio extraction mode for the weather data pipeline:
+- TokenBucket: Rate limiter matching the API quota
+- fetch_weather_data_async: Fetches one city with retries and jittered backoff
+- extract_async: Fetches all cities concurrently and streams them into the staging table
+"""
+
+import time
+import random
+import asyncio
+import logging
+import aiohttp
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from instrumentation import record_stage
+from utils.cache import get_cache
+from utils.etl import WeatherDataETL
+from utils.staging import StagingWriter, DEFAULT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when the APP section of config.yaml does not override them
+DEFAULT_RATE_LIMIT_PER_MINUTE = 60
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_TIMEOUT = 10
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token-bucket rate limiter for asyncio tasks."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to one second of tokens, at least 1)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _backoff_delay(attempt: int, base: float, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, honouring a Retry-After header when present."""
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return random.uniform(0, base * 2 ** attempt)
+
+
+async def fetch_weather_data_async(
+    session: aiohttp.ClientSession,
+    city: str,
+    config: Dict[str, Any],
+    limiter: TokenBucket,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff_base: float = DEFAULT_BACKOFF_BASE
+) -> Dict[str, Any]:
+    """
+    Fetch weather data for a single city, retrying transient failures.
+    
+    Args:
+        session: Pooled aiohttp client session
+        city: Name of the city
+        config: Configuration dictionary containing API details
+        limiter: Shared token bucket limiting requests to the API quota
+        max_retries: Number of retries after the first attempt
+        backoff_base: Base delay in seconds for exponential backoff
+        
+    Returns:
+        Dictionary containing weather data
+    
+    Raises:
+        aiohttp.ClientError: If the request still fails after all retries
+    """
+    params = {
+        'q': city,
+        'appid': config['APP']['API_KEY'],
+        'units': WeatherDataETL.get_units(config)
+    }
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        retry_after = None
+        try:
+            async with session.get(config['APP']['URL'], params=params) as response:
+                if response.status in RETRYABLE_STATUSES:
+                    retry_after = response.headers.get('Retry-After')
+                response.raise_for_status()
+                return await response.json()
+        except aiohttp.ClientResponseError as e:
+            if e.status not in RETRYABLE_STATUSES or attempt == max_retries:
+                raise
+            error = e
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == max_retries:
+                raise
+            error = e
+
+        delay = _backoff_delay(attempt, backoff_base, retry_after)
+        logger.warning(f"Retrying {city} in {delay:.2f}s after error: {error!r}")
+        await asyncio.sleep(delay)
+
+
+async def fetch_all_async(cities: List[str], config: Dict[str, Any], extraction_timestamp: datetime,
+                          writer: StagingWriter,
+                          cache_updates: Optional[List[Tuple[str, Dict[str, Any]]]] = None) -> int:
+    """
+    Fetch weather data for all cities concurrently within the API quota.
+    
+    Records are streamed to the staging writer as they arrive instead of
+    being buffered for all cities; writes run in a worker thread so they
+    do not block the event loop.
+    
+    Args:
+        cities: List of city names
+        config: Configuration dictionary
+        extraction_timestamp: Timestamp of data extraction
+        writer: Open staging writer receiving the prepared records
+        cache_updates: List collecting (city, payload) pairs to store in the
+            response cache after the staging transaction commits
+        
+    Returns:
+        Number of records handed to the writer
+    """
+    app_config = config['APP']
+    rate_per_minute = app_config.get('RATE_LIMIT_PER_MINUTE', DEFAULT_RATE_LIMIT_PER_MINUTE)
+    max_concurrency = app_config.get('MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)
+    max_retries = app_config.get('MAX_RETRIES', DEFAULT_MAX_RETRIES)
+    backoff_base = app_config.get('BACKOFF_BASE', DEFAULT_BACKOFF_BASE)
+
+    limiter = TokenBucket(rate=rate_per_minute / 60)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    connector = aiohttp.TCPConnector(limit=max_concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=app_config.get('TIMEOUT', DEFAULT_TIMEOUT))
+    cache = get_cache(config)
+    units = WeatherDataETL.get_units(config)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def fetch_city(session: aiohttp.ClientSession, city: str) -> Optional[Dict[str, Any]]:
+        if cache is not None and cache.is_fresh(city, units):
+            logger.info(f"Skipping {city}: cached observation is still current")
+            return None
+        async with semaphore:
+            try:
+                data = await fetch_weather_data_async(session, city, config, limiter, max_retries, backoff_base)
+                if cache_updates is not None:
+                    cache_updates.append((city, data))
+                if cache is not None and not cache.is_new_observation(city, units, data):
+                    logger.info(f"Skipping {city}: observation time {data['dt']} has not changed")
+                    return None
+                logger.info(f"Successfully fetched data for {city}")
+                return WeatherDataETL.prepare_weather_record(city, data, extraction_timestamp)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching data for {city}: {e}")
+                return None
+
+    async def fetch_and_queue(session: aiohttp.ClientSession, city: str) -> None:
+        record = await fetch_city(session, city)
+        if record is not None:
+            await queue.put(record)
+
+    async def write_records() -> int:
+        written = 0
+        while True:
+            record = await queue.get()
+            if record is None:
+                return written
+            await asyncio.to_thread(writer.add, record)
+            written += 1
+
+    consumer = asyncio.create_task(write_records())
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(*(fetch_and_queue(session, city) for city in cities))
+    finally:
+        await queue.put(None)
+    return await consumer
+
+
+def extract_async(cities: List[str], config: Dict[str, Any], database: Any) -> datetime:
+    """
+    Extract weather data concurrently and store it in the staging table.
+    
+    Same contract as utils.etl.extract, but throughput is bounded by the
+    configured API quota instead of serial request latency.
+    
+    Args:
+        cities: List of city names
+        config: Configuration dictionary
+        database: Database connection object
+        
+    Returns:
+        datetime: Timestamp of extraction
+    """
+    extraction_timestamp = datetime.now()
+    logger.info(f"Starting async extraction for {len(cities)} cities")
+
+    batch_size = config['APP'].get('STAGING_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    cache_updates = []
+    with StagingWriter(database, batch_size=batch_size) as writer:
+        written = asyncio.run(fetch_all_async(cities, config, extraction_timestamp, writer, cache_updates))
+    # The writer has committed at this point; a rollback raises before the cache is touched
+    cache = get_cache(config)
+    if cache is not None:
+        cache.update_many(WeatherDataETL.get_units(config), cache_updates)
+    record_stage(rows_out=written)
+    return extraction_timestamp
@@ -0,0 +1,74 @@
+"""
+Weather Data Backfill
+Transforms every staged extraction batch in a time range in one vectorized
+pass and writes the result, instead of replaying one DAG run per hour.
+
+By default only the postgres sink is written: it upserts on
+(city, event_timestamp), so re-running a range is idempotent. The csv and
+parquet sinks are append-only; passing them with --sinks duplicates any
+rows of the range that were already loaded there.
+
+Usage:
+    python -m utils.backfill --config config.yaml --start 2025-01-01 --end 2025-02-01
+    python -m utils.backfill --start 2025-01-01 --end 2025-02-01 --sinks postgres parquet
+"""
+
+import logging
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+from instrumentation import write_prometheus
+from utils.config import Config
+from utils.database import Database
+from utils.etl import backfill
+from utils.sinks import write_sinks
+
+logger = logging.getLogger(__name__)
+
+# Sinks that upsert and can therefore be re-run over the same range
+IDEMPOTENT_SINKS = ['postgres']
+
+
+def run_backfill(config_path: str, start: datetime, end: datetime, sinks: Optional[List[str]] = None) -> int:
+    """
+    Backfill the processed data for extraction timestamps in [start, end).
+    
+    Args:
+        config_path: Path to config.yaml
+        start: Inclusive lower bound on extraction_timestamp
+        end: Exclusive upper bound on extraction_timestamp
+        sinks: Sinks to write (default: postgres only; csv and parquet are not idempotent)
+        
+    Returns:
+        Number of rows written
+    """
+    config = Config(config_path).config
+    sinks = sinks or IDEMPOTENT_SINKS
+    appended = [sink for sink in sinks if sink not in IDEMPOTENT_SINKS]
+    if appended:
+        logger.warning(f"Sinks {appended} are append-only; rows already loaded for this range will be duplicated")
+    config = {**config, 'SINKS': {**(config.get('SINKS') or {}), 'ENABLED': sinks}}
+    database = Database(config=config)
+
+    df = backfill(start, end, database)
+    if df.empty:
+        logger.info(f"No staged data between {start} and {end}")
+        return 0
+
+    write_sinks(df=df, config=config, database=database)
+    logger.info(f"Backfilled {len(df)} rows between {start} and {end}")
+    return len(df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill processed weather data from the staging table')
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--start', required=True, type=datetime.fromisoformat)
+    parser.add_argument('--end', required=True, type=datetime.fromisoformat)
+    parser.add_argument('--sinks', nargs='+', default=None,
+                        help='Sinks to write (default: postgres; csv/parquet append and may duplicate rows)')
+    args = parser.parse_args()
+
+    run_backfill(args.config, args.start, args.end, args.sinks)
+    write_prometheus()
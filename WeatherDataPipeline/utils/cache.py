@@ -0,0 +1,151 @@
+"""
+Weather Response Cache
+Observation-aware cache for weather API responses, keyed by city and units.
+Entries live in memory and in a SQLite file so they survive between task runs.
+An entry stays fresh until the provider is expected to publish the next
+observation (last `dt` + update interval).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# OpenWeatherMap refreshes current weather roughly every 10 minutes
+DEFAULT_UPDATE_INTERVAL = 600
+# Minimum time an entry stays fresh, even when the provider's `dt` is already old
+DEFAULT_MIN_TTL = 60
+
+
+class WeatherResponseCache:
+    """Two-level (memory + SQLite) cache of weather API responses."""
+
+    def __init__(self, path: Optional[str] = None, update_interval: int = DEFAULT_UPDATE_INTERVAL,
+                 min_ttl: int = DEFAULT_MIN_TTL):
+        """
+        Args:
+            path: SQLite file path; None keeps the cache in memory only
+            update_interval: Provider update interval in seconds
+            min_ttl: Minimum freshness window in seconds
+        """
+        self.update_interval = update_interval
+        self.min_ttl = min_ttl
+        self._memory: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS weather_response_cache (
+                    city TEXT NOT NULL,
+                    units TEXT NOT NULL,
+                    dt INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (city, units)
+                )
+            """)
+            self._conn.commit()
+
+    def _expires_at(self, dt: int, now: float) -> float:
+        return max(dt + self.update_interval, now + self.min_ttl)
+
+    def get_entry(self, city: str, units: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry (dt, expires_at, payload) for a city, fresh or not."""
+        key = (city, units)
+        entry = self._memory.get(key)
+        if entry is None and self._conn is not None:
+            row = self._conn.execute(
+                "SELECT dt, expires_at, payload FROM weather_response_cache WHERE city = ? AND units = ?",
+                key
+            ).fetchone()
+            if row is not None:
+                entry = {'dt': row[0], 'expires_at': row[1], 'payload': json.loads(row[2])}
+                self._memory[key] = entry
+        return entry
+
+    def is_fresh(self, city: str, units: str) -> bool:
+        """Whether the cached observation is still current, so the API call can be skipped."""
+        entry = self.get_entry(city, units)
+        return entry is not None and time.time() < entry['expires_at']
+
+    def is_new_observation(self, city: str, units: str, payload: Dict[str, Any]) -> bool:
+        """Whether a fetched response holds a different observation (`dt`) than the cached one."""
+        previous = self.get_entry(city, units)
+        return previous is None or payload['dt'] != previous['dt']
+
+    def update(self, city: str, units: str, payload: Dict[str, Any]) -> bool:
+        """
+        Store a fresh API response.
+        
+        Call this only once the observation has been durably staged; otherwise a
+        failed insert would leave the city marked as current and it would be skipped.
+        
+        Args:
+            city: Name of the city
+            units: Units requested from the API
+            payload: Raw API response
+            
+        Returns:
+            True if the response holds a new observation, False if `dt` did not move
+        """
+        is_new = self.is_new_observation(city, units, payload)
+
+        entry = {
+            'dt': payload['dt'],
+            'expires_at': self._expires_at(payload['dt'], time.time()),
+            'payload': payload
+        }
+        self._memory[(city, units)] = entry
+        if self._conn is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO weather_response_cache (city, units, dt, expires_at, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (city, units, entry['dt'], entry['expires_at'], json.dumps(payload))
+            )
+            self._conn.commit()
+        return is_new
+
+    def update_many(self, units: str, responses: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store several (city, payload) responses, e.g. after the staging insert commits."""
+        for city, payload in responses:
+            self.update(city, units, payload)
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_cache: Optional[WeatherResponseCache] = None
+
+
+def get_cache(config: Dict[str, Any]) -> Optional[WeatherResponseCache]:
+    """
+    Return the process-wide response cache described by the CACHE config section.
+    
+    Args:
+        config: Configuration dictionary
+        
+    Returns:
+        WeatherResponseCache, or None if caching is disabled
+    """
+    global _cache
+    cache_config = config.get('CACHE') or {}
+    if not cache_config.get('ENABLED', False):
+        return None
+    if _cache is None:
+        _cache = WeatherResponseCache(
+            path=cache_config.get('PATH'),
+            update_interval=cache_config.get('UPDATE_INTERVAL_SECONDS', DEFAULT_UPDATE_INTERVAL),
+            min_ttl=cache_config.get('MIN_TTL_SECONDS', DEFAULT_MIN_TTL)
+        )
+        logger.info(f"Weather response cache initialized at {cache_config.get('PATH') or 'memory'}")
+    return _cache
@@ -1,30 +1,73 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 
 import logging
-from utils.config import Config
+import threading
+from typing import Dict, Any, Optional
 # Configure logging to output to the console
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Pool defaults used when the DATABASE section of config.yaml does not override them
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 5
+DEFAULT_POOL_PRE_PING = True
+DEFAULT_POOL_RECYCLE = 1800
+
+# Process-wide engines, keyed by connection URL
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def _database_url(db_config: Dict[str, Any]) -> str:
+    return f"postgresql://{db_config['USER']}:{db_config['PASSWORD']}@{db_config['HOST']}:{db_config['PORT']}/{db_config['DBNAME']}"
+
+
+def get_engine(config: Dict[str, Any]) -> Engine:
+    """
+    Return the process-wide pooled engine for the configured database,
+    creating it on first use. No connection is opened until a query runs.
+    """
+    db_config = config['DATABASE']
+    db_url = _database_url(db_config)
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            try:
+                engine = create_engine(
+                    db_url,
+                    pool_size=db_config.get('POOL_SIZE', DEFAULT_POOL_SIZE),
+                    max_overflow=db_config.get('MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+                    pool_pre_ping=db_config.get('POOL_PRE_PING', DEFAULT_POOL_PRE_PING),
+                    pool_recycle=db_config.get('POOL_RECYCLE', DEFAULT_POOL_RECYCLE)
+                )
+                _engines[db_url] = engine
+                logging.info("Database engine created successfully.")
+            except Exception as e:
+                logging.error(f"Error while creating the database engine: {e}")
+                raise
+        return engine
+
+
+def dispose_engines() -> None:
+    """Dispose every process-wide engine, closing their pooled connections."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
 class Database:
     def __init__(self, config):
         self.config = config
-        self.engine = self._create_engine()
-        self.conn = self.engine.connect()
-        self.test_connection()  # Test the connection upon initialization
+        self._engine: Optional[Engine] = None
 
-    def _create_engine(self):
-        # Retrieve database config from the loaded config file
-        db_config = self.config['DATABASE']
-        try:
-            # Constructing the database connection URL
-            db_url = f"postgresql://{db_config['USER']}:{db_config['PASSWORD']}@{db_config['HOST']}:{db_config['PORT']}/{db_config['DBNAME']}"
-            engine = create_engine(db_url)
-            logging.info("Database engine created successfully.")
-            return engine
-        except Exception as e:
-            logging.error(f"Error while creating the database engine: {e}")
-            raise
+    @property
+    def engine(self) -> Engine:
+        """The shared pooled engine, created lazily on first access."""
+        if self._engine is None:
+            self._engine = get_engine(self.config)
+        return self._engine
 
     def test_connection(self):
         """Test the database connection by executing a simple query."""
@@ -39,9 +82,6 @@ class Database:
             logging.error(f"Database connection test failed: {e}")
 
     def close(self):
-        """Close the engine connection, but it's usually not necessary for SQLAlchemy's engine."""
-        logging.info("Closing database engine.")
-        # The engine connection is closed automatically after use with context managers
-
-
-Database(config=Config('/media/sorour/8fe1c1c7-b574-4c1a-bf0c-dd93e66cb530/projects/DataEngineeringProjects/WeatherDataPipeline/config.yaml').config).test_connection()
\ No newline at end of file
+        """Release this handle; the shared engine stays pooled for other tasks in the process."""
+        logging.info("Closing database handle.")
+        self._engine = None
@@ -2,7 +2,9 @@
 Weather Data ETL Utilities
 This module contains the core ETL functions for the weather data pipeline:
 - extract: Fetches weather data from API and stores in staging table
+  (serially, or concurrently via utils.async_extract)
 - transform: Processes staged data with additional metrics
+- backfill: Transforms a whole range of extraction batches in one pass
 - load: Saves transformed data to CSV file
 """
 
@@ -12,8 +14,12 @@ import logging
 import requests
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any
-from sqlalchemy import Table, MetaData, insert, text
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import text
+
+from instrumentation import instrument_stage, record_stage
+from utils.cache import WeatherResponseCache, get_cache
+from utils.staging import StagingWriter
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +31,11 @@ logger = logging.getLogger(__name__)
 class WeatherDataETL:
     """Class to handle Weather Data ETL operations."""
     
+    @staticmethod
+    def get_units(config: Dict[str, Any]) -> str:
+        """Return the units requested from the API."""
+        return config['APP'].get('UNITS', 'metric')
+
     @staticmethod
     def fetch_weather_data(city: str, config: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -43,12 +54,54 @@ class WeatherDataETL:
         params = {
             'q': city,
             'appid': config['APP']['API_KEY'],
-            'units': 'metric'
+            'units': WeatherDataETL.get_units(config)
         }
         response = requests.get(config['APP']['URL'], params=params)
         response.raise_for_status()
         return response.json()
 
+    @staticmethod
+    def fetch_new_observation(city: str, config: Dict[str, Any],
+                              cache: Optional[WeatherResponseCache],
+                              cache_updates: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+                              ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Fetch weather data for a city unless the cached observation is still current.
+        
+        The cache itself is not modified: fetched responses are appended to
+        `cache_updates`, to be applied with cache.update_many once the staging
+        insert has committed.
+        
+        Args:
+            city: Name of the city
+            config: Configuration dictionary containing API details
+            cache: Response cache, or None to always call the API
+            cache_updates: List collecting (city, payload) pairs for the cache
+            
+        Returns:
+            Tuple of (whether the API was called, weather data). The data is
+            None if the observation is cached or unchanged and should not be
+            staged again; an unchanged observation still used an API request.
+        
+        Raises:
+            requests.exceptions.RequestException: If API request fails
+        """
+        if cache is None:
+            return True, WeatherDataETL.fetch_weather_data(city, config)
+
+        units = WeatherDataETL.get_units(config)
+        if cache.is_fresh(city, units):
+            logger.info(f"Skipping {city}: cached observation is still current")
+            return False, None
+
+        data = WeatherDataETL.fetch_weather_data(city, config)
+        if cache_updates is not None:
+            cache_updates.append((city, data))
+        if not cache.is_new_observation(city, units, data):
+            logger.info(f"Skipping {city}: observation time {data['dt']} has not changed")
+            return True, None
+        return True, data
+
     @staticmethod
     def prepare_weather_record(city: str, data: Dict[str, Any], extraction_timestamp: datetime) -> Dict[str, Any]:
         """
@@ -75,10 +128,33 @@ class WeatherDataETL:
             'extraction_timestamp': extraction_timestamp
         }
 
+def insert_staging_records(weather_data: List[Dict[str, Any]], database: Any) -> None:
+    """
+    Insert prepared weather records into the staging table in batches (see utils.staging).
+    
+    Args:
+        weather_data: List of records built by WeatherDataETL.prepare_weather_record
+        database: Database connection object
+        
+    Raises:
+        Exception: If database insertion fails
+    """
+    if not weather_data:
+        logger.info("No new observations to insert into staging table")
+        return
+
+    with StagingWriter(database) as writer:
+        writer.add_many(weather_data)
+    record_stage(rows_out=len(weather_data))
+
+@instrument_stage('weather', 'extract')
 def extract(cities: List[str], config: Dict[str, Any], database: Any) -> datetime:
     """
     Extract weather data from API and store in staging table.
     
+    When APP.EXTRACT_MODE is 'async' the cities are fetched concurrently
+    (see utils.async_extract); otherwise they are fetched one at a time.
+    
     Args:
         cities: List of city names
         config: Configuration dictionary
@@ -90,38 +166,42 @@ def extract(cities: List[str], config: Dict[str, Any], database: Any) -> datetim
     Raises:
         Exception: If database insertion fails
     """
+    if config['APP'].get('EXTRACT_MODE', 'sync') == 'async':
+        # Imported here because utils.async_extract depends on this module
+        from utils.async_extract import extract_async
+        return extract_async(cities, config, database)
+
     weather_data = []
+    cache_updates = []
     extraction_timestamp = datetime.now()
     etl = WeatherDataETL()
+    cache = get_cache(config)
     
     logger.info(f"Starting extraction for cities: {cities}")
     
     for city in cities:
+        requested = True
         try:
-            data = etl.fetch_weather_data(city, config)
-            weather_record = etl.prepare_weather_record(city, data, extraction_timestamp)
-            weather_data.append(weather_record)
-            
-            logger.info(f"Successfully fetched data for {city}")
-            time.sleep(1)  # Rate limiting
+            requested, data = etl.fetch_new_observation(city, config, cache, cache_updates)
+            if data is not None:
+                weather_record = etl.prepare_weather_record(city, data, extraction_timestamp)
+                weather_data.append(weather_record)
+                logger.info(f"Successfully fetched data for {city}")
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching data for {city}: {e}")
+
+        # Rate limiting: every API call counts towards the quota, only cache hits are free
+        if requested:
+            time.sleep(1)
     
-    try:
-        metadata = MetaData()
-        staging_weather_table = Table('stagging_weather_data', metadata, autoload_with=database.engine)
-        
-        with database.engine.begin() as connection:
-            connection.execute(insert(staging_weather_table), weather_data)
-            logger.info(f"Successfully inserted {len(weather_data)} records into staging table")
-        
-        return extraction_timestamp
-            
-    except Exception as e:
-        logger.error(f"Error inserting data into the database: {e}")
-        raise
+    insert_staging_records(weather_data, database)
+    # Only mark observations as seen once they are committed to the staging table
+    if cache is not None:
+        cache.update_many(etl.get_units(config), cache_updates)
+    return extraction_timestamp
 
+@instrument_stage('weather', 'transform')
 def transform(extraction_timestamp: datetime, database: Any) -> pd.DataFrame:
     """
     Transform weather data with additional metrics.
@@ -141,6 +221,24 @@ def transform(extraction_timestamp: datetime, database: Any) -> pd.DataFrame:
         df = pd.DataFrame(result.fetchall(), columns=result.keys())
     
     logger.info(f"Retrieved {len(df)} records for transformation")
+    record_stage(rows_in=len(df))
+    
+    return transform_frame(df)
+
+def transform_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply the weather transformations to staged rows.
+    
+    All operations are vectorized, so the frame may hold one extraction
+    batch or many (see backfill).
+    
+    Args:
+        df: Rows from the staging table
+        
+    Returns:
+        pandas.DataFrame: Transformed weather data
+    """
+    df = df.copy()
     
     # Time-based transformations
     df['processing_timestamp'] = pd.to_datetime(df['timestamp'])
@@ -181,6 +279,39 @@ def transform(extraction_timestamp: datetime, database: Any) -> pd.DataFrame:
     
     return df[columns_order]
 
+@instrument_stage('weather', 'backfill')
+def backfill(start: datetime, end: datetime, database: Any) -> pd.DataFrame:
+    """
+    Transform every extraction batch in [start, end) in one vectorized pass.
+    
+    The range predicate on extraction_timestamp lets Postgres prune the
+    staging table to the daily partitions covering the range.
+    
+    Args:
+        start: Inclusive lower bound on extraction_timestamp
+        end: Exclusive upper bound on extraction_timestamp
+        database: Database connection object
+        
+    Returns:
+        pandas.DataFrame: Transformed weather data for the whole range
+    """
+    query = text(
+        'SELECT * FROM stagging_weather_data '
+        'WHERE extraction_timestamp >= :start AND extraction_timestamp < :end '
+        'ORDER BY extraction_timestamp'
+    )
+    
+    with database.engine.connect() as connection:
+        result = connection.execute(query, {"start": start, "end": end})
+        df = pd.DataFrame(result.fetchall(), columns=result.keys())
+    
+    batches = df['extraction_timestamp'].nunique() if not df.empty else 0
+    logger.info(f"Retrieved {len(df)} records from {batches} extraction batches for backfill")
+    record_stage(rows_in=len(df), batches=batches)
+    
+    return transform_frame(df)
+
+@instrument_stage('weather', 'load_csv')
 def load(df: pd.DataFrame, output_path: str) -> None:
     """
     Save transformed data to CSV file.
@@ -0,0 +1,139 @@
+"""
+Staging Table Partition Maintenance
+Creates daily range partitions of the staging table ahead of time and drops
+partitions that fall outside the retention window.
+"""
+
+import re
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
+from sqlalchemy import text
+
+from utils.staging import STAGING_TABLE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_PARTITIONS_AHEAD = 2
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{8})$')
+
+
+def partition_name(day: date, table_name: str = STAGING_TABLE) -> str:
+    """Return the name of the daily partition holding `day`."""
+    return f"{table_name}_p{day:%Y%m%d}"
+
+
+def ensure_daily_partitions(database: Any, start: date, end: date, table_name: str = STAGING_TABLE) -> None:
+    """
+    Create the daily partitions covering [start, end] if they do not exist.
+    
+    Args:
+        database: Database connection object
+        start: First day to cover
+        end: Last day to cover
+        table_name: Partitioned parent table
+    """
+    with database.engine.begin() as connection:
+        day = start
+        while day <= end:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(day, table_name)} "
+                f"PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+            day += timedelta(days=1)
+    logger.info(f"Ensured daily partitions of {table_name} from {start} to {end}")
+
+
+def list_daily_partitions(database: Any, table_name: str = STAGING_TABLE) -> Dict[date, str]:
+    """
+    Return the existing daily partitions of a table, keyed by day.
+    """
+    query = text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table_name
+    """)
+    with database.engine.connect() as connection:
+        names = [row[0] for row in connection.execute(query, {"table_name": table_name})]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions[datetime.strptime(match.group(1), '%Y%m%d').date()] = name
+    return partitions
+
+
+def drop_expired_partitions(database: Any, retention_days: int, today: Optional[date] = None,
+                            table_name: str = STAGING_TABLE) -> List[str]:
+    """
+    Drop daily partitions older than the retention window.
+    
+    Args:
+        database: Database connection object
+        retention_days: Number of days of staging data to keep
+        today: Reference day (defaults to today)
+        table_name: Partitioned parent table
+        
+    Returns:
+        Names of the dropped partitions
+    """
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    expired = [name for day, name in sorted(list_daily_partitions(database, table_name).items()) if day < cutoff]
+
+    with database.engine.begin() as connection:
+        for name in expired:
+            connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            logger.info(f"Dropped expired staging partition {name}")
+    return expired
+
+
+def is_partitioned(database: Any, table_name: str = STAGING_TABLE) -> bool:
+    """
+    Whether a table exists and is a declaratively partitioned parent.
+    """
+    query = text("""
+        SELECT 1
+        FROM pg_partitioned_table
+        JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+        WHERE pg_class.relname = :table_name
+    """)
+    with database.engine.connect() as connection:
+        return connection.execute(query, {"table_name": table_name}).first() is not None
+
+
+def maintain_staging_partitions(config: Dict[str, Any], database: Any) -> bool:
+    """
+    Create upcoming daily partitions and apply retention, per the STAGING config section.
+    
+    Skipped (with a warning) when STAGING.MAINTAIN_PARTITIONS is false or the
+    staging table is still the old unpartitioned one, so existing deployments
+    keep extracting until they run the migration in sql/staging_schema.sql.
+    
+    Args:
+        config: Configuration dictionary
+        database: Database connection object
+        
+    Returns:
+        True if maintenance ran
+    """
+    staging_config = config.get('STAGING') or {}
+    if not staging_config.get('MAINTAIN_PARTITIONS', True):
+        return False
+    if not is_partitioned(database):
+        logger.warning(
+            f"{STAGING_TABLE} is not partitioned; skipping partition maintenance. "
+            "See the migration notes in sql/staging_schema.sql."
+        )
+        return False
+
+    today = date.today()
+    ahead = staging_config.get('PARTITIONS_AHEAD', DEFAULT_PARTITIONS_AHEAD)
+    ensure_daily_partitions(database, today, today + timedelta(days=ahead))
+    drop_expired_partitions(database, staging_config.get('RETENTION_DAYS', DEFAULT_RETENTION_DAYS), today)
+    return True
@@ -0,0 +1,281 @@
+"""
+Incremental Rolling Weather Analytics
+Maintains per-city rolling statistics (24h/7d temperature mean, min and max,
+severity mean and trend, temperature anomaly z-scores) without rescanning
+history. Each city keeps a compact window state that is persisted between
+runs and updated with every new batch in O(batch) amortized time:
+- running sums give means, variances and the severity trend (least-squares slope)
+- monotonic deques give sliding minimum and maximum
+"""
+
+import os
+import json
+import math
+import logging
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict, Any, Optional
+
+from instrumentation import instrument_stage, stage
+from utils.sinks import (write_parquet_dataset, compact_partitions, batch_partitions,
+                         DEFAULT_COMPACT_MIN_FILES)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOWS = {'24h': 24 * 3600, '7d': 7 * 24 * 3600}
+DEFAULT_ROLLING_PATH = 'WeatherDataPipeline/processed_rolling'
+DEFAULT_STATE_PATH = 'WeatherDataPipeline/state/rolling_state.json'
+
+
+class RollingWindow:
+    """Sliding time window over (timestamp, temperature, severity) observations."""
+
+    def __init__(self, span: int):
+        """
+        Args:
+            span: Window length in seconds
+        """
+        self.span = span
+        self.events = deque()    # (ts, temperature, severity)
+        self.max_queue = deque() # (ts, temperature), temperatures decreasing
+        self.min_queue = deque() # (ts, temperature), temperatures increasing
+        self.n = 0
+        self.sum_temp = 0.0
+        self.sumsq_temp = 0.0
+        self.sum_sev = 0.0
+        # Sums for the severity trend; time is measured in hours
+        self.sum_t = 0.0
+        self.sumsq_t = 0.0
+        self.sum_t_sev = 0.0
+
+    def _accumulate(self, ts: int, temperature: float, severity: float, sign: int) -> None:
+        t = ts / 3600
+        self.n += sign
+        self.sum_temp += sign * temperature
+        self.sumsq_temp += sign * temperature * temperature
+        self.sum_sev += sign * severity
+        self.sum_t += sign * t
+        self.sumsq_t += sign * t * t
+        self.sum_t_sev += sign * t * severity
+
+    def evict(self, now: int) -> None:
+        """Drop observations that are no longer inside the window ending at `now`."""
+        cutoff = now - self.span
+        while self.events and self.events[0][0] <= cutoff:
+            self._accumulate(*self.events.popleft(), sign=-1)
+        while self.max_queue and self.max_queue[0][0] <= cutoff:
+            self.max_queue.popleft()
+        while self.min_queue and self.min_queue[0][0] <= cutoff:
+            self.min_queue.popleft()
+
+    def add(self, ts: int, temperature: float, severity: float) -> None:
+        """
+        Add an observation; timestamps must be increasing.
+        
+        Raises:
+            ValueError: If temperature or severity is not finite (NaN would
+                poison the running sums and never leave the monotonic deques)
+        """
+        if not (math.isfinite(temperature) and math.isfinite(severity)):
+            raise ValueError(f"Non-finite observation at {ts}: temperature={temperature}, severity={severity}")
+        self.evict(ts)
+        self.events.append((ts, temperature, severity))
+        self._accumulate(ts, temperature, severity, sign=1)
+        while self.max_queue and self.max_queue[-1][1] <= temperature:
+            self.max_queue.pop()
+        self.max_queue.append((ts, temperature))
+        while self.min_queue and self.min_queue[-1][1] >= temperature:
+            self.min_queue.pop()
+        self.min_queue.append((ts, temperature))
+
+    def temperature_std(self) -> float:
+        if self.n < 2:
+            return float('nan')
+        mean = self.sum_temp / self.n
+        variance = max(self.sumsq_temp / self.n - mean * mean, 0.0) * self.n / (self.n - 1)
+        return math.sqrt(variance)
+
+    def zscore(self, temperature: float) -> float:
+        """Z-score of a temperature against the current window contents."""
+        std = self.temperature_std()
+        if math.isnan(std) or std == 0:
+            return float('nan')
+        return (temperature - self.sum_temp / self.n) / std
+
+    def stats(self) -> Dict[str, float]:
+        """Current window statistics."""
+        if self.n == 0:
+            nan = float('nan')
+            return {'temp_mean': nan, 'temp_min': nan, 'temp_max': nan, 'severity_mean': nan, 'severity_trend': nan}
+
+        denominator = self.n * self.sumsq_t - self.sum_t * self.sum_t
+        trend = (self.n * self.sum_t_sev - self.sum_t * self.sum_sev) / denominator if denominator > 1e-9 else float('nan')
+        return {
+            'temp_mean': self.sum_temp / self.n,
+            'temp_min': self.min_queue[0][1],
+            'temp_max': self.max_queue[0][1],
+            'severity_mean': self.sum_sev / self.n,
+            'severity_trend': trend,  # change in severity per hour
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'span': self.span,
+            'events': list(self.events),
+            'max_queue': list(self.max_queue),
+            'min_queue': list(self.min_queue),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollingWindow':
+        window = cls(data['span'])
+        for ts, temperature, severity in data['events']:
+            window.events.append((ts, temperature, severity))
+            window._accumulate(ts, temperature, severity, sign=1)
+        window.max_queue = deque(tuple(item) for item in data['max_queue'])
+        window.min_queue = deque(tuple(item) for item in data['min_queue'])
+        return window
+
+
+class RollingWeatherAnalytics:
+    """Per-city rolling window state with incremental batch updates."""
+
+    def __init__(self, windows: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            windows: Mapping of window name (used in column names) to length in seconds
+        """
+        self.windows = windows or dict(DEFAULT_WINDOWS)
+        self.state: Dict[str, Dict[str, Any]] = {}
+
+    def _city_state(self, city: str) -> Dict[str, Any]:
+        if city not in self.state:
+            self.state[city] = {
+                'last_ts': None,
+                'windows': {name: RollingWindow(span) for name, span in self.windows.items()}
+            }
+        return self.state[city]
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fold a batch of processed rows into the window state.
+        
+        Observations at or before a city's last seen event time are skipped,
+        so re-delivered rows do not double count. Rows with a missing or
+        non-finite temperature or severity are dropped.
+        
+        Args:
+            df: Processed weather data with city, event_timestamp, temperature and weather_severity
+            
+        Returns:
+            pandas.DataFrame: One row per new observation with the rolling statistics after it
+        """
+        batch = df[['city', 'event_timestamp', 'temperature', 'weather_severity']].copy()
+        batch['event_timestamp'] = pd.to_datetime(batch['event_timestamp'])
+        batch['ts'] = (batch['event_timestamp'] - pd.Timestamp('1970-01-01')) // pd.Timedelta('1s')
+        for column in ('temperature', 'weather_severity'):
+            batch[column] = pd.to_numeric(batch[column], errors='coerce').astype('float64')
+        finite = np.isfinite(batch['temperature']) & np.isfinite(batch['weather_severity'])
+        if not finite.all():
+            logger.warning(f"Dropped {int((~finite).sum())} observations with missing or non-finite values")
+            batch = batch[finite]
+        batch = batch.sort_values(['city', 'ts'])
+
+        rows = []
+        skipped = 0
+        for city, event_timestamp, temperature, severity, ts in batch.itertuples(index=False, name=None):
+            city_state = self._city_state(city)
+            if city_state['last_ts'] is not None and ts <= city_state['last_ts']:
+                skipped += 1
+                continue
+
+            row = {'city': city, 'event_timestamp': event_timestamp, 'temperature': float(temperature)}
+            for name, window in city_state['windows'].items():
+                window.evict(ts)
+                # Anomalies are scored against the window before the new value joins it
+                row[f'temp_zscore_{name}'] = window.zscore(float(temperature))
+                window.add(ts, float(temperature), float(severity))
+                for stat, value in window.stats().items():
+                    row[f'{stat}_{name}'] = value
+            city_state['last_ts'] = ts
+            rows.append(row)
+
+        if skipped:
+            logger.info(f"Skipped {skipped} observations already folded into the rolling state")
+        return pd.DataFrame(rows)
+
+    def save(self, path: str) -> None:
+        """Persist the window state as JSON (written atomically)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            'windows': self.windows,
+            'cities': {
+                city: {
+                    'last_ts': city_state['last_ts'],
+                    'windows': {name: window.to_dict() for name, window in city_state['windows'].items()}
+                }
+                for city, city_state in self.state.items()
+            }
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, windows: Optional[Dict[str, int]] = None) -> 'RollingWeatherAnalytics':
+        """
+        Load persisted window state, or start empty if none exists or the windows changed.
+        """
+        analytics = cls(windows)
+        if not os.path.exists(path):
+            return analytics
+        with open(path, 'r') as file:
+            data = json.load(file)
+        if data['windows'] != analytics.windows:
+            logger.warning("Rolling window definitions changed; starting from empty state")
+            return analytics
+        for city, city_state in data['cities'].items():
+            analytics.state[city] = {
+                'last_ts': city_state['last_ts'],
+                'windows': {name: RollingWindow.from_dict(window) for name, window in city_state['windows'].items()}
+            }
+        return analytics
+
+
+@instrument_stage('weather', 'rolling_analytics')
+def update_rolling_analytics(df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Update the rolling state with a processed batch and append the results
+    to the rolling analytics dataset, per the ANALYTICS config section.
+    Partitions touched by the batch are compacted like the processed dataset.
+    
+    Args:
+        df: Processed weather data
+        config: Configuration dictionary
+        
+    Returns:
+        pandas.DataFrame: Rolling statistics for the batch
+    """
+    analytics_config = config.get('ANALYTICS') or {}
+    state_path = analytics_config.get('STATE_PATH', DEFAULT_STATE_PATH)
+    windows = analytics_config.get('WINDOWS_SECONDS') or None
+
+    analytics = RollingWeatherAnalytics.load(state_path, windows)
+    rolling_df = analytics.update(df)
+    if not rolling_df.empty:
+        rolling_path = analytics_config.get('ROLLING_PATH', DEFAULT_ROLLING_PATH)
+        storage_options = config.get('STORAGE_OPTIONS') or {}
+        with stage('weather', 'rolling_write', rows_in=len(rolling_df),
+                   bytes_in=int(rolling_df.memory_usage(index=True).sum())):
+            write_parquet_dataset(rolling_df, rolling_path, storage_options)
+            compact_partitions(rolling_path, batch_partitions(rolling_df),
+                               analytics_config.get('COMPACT_MIN_FILES', DEFAULT_COMPACT_MIN_FILES),
+                               storage_options)
+    # State is saved after the results are written, so a failed write is retried next run
+    analytics.save(state_path)
+    logger.info(f"Updated rolling analytics for {len(rolling_df)} observations")
+    return rolling_df
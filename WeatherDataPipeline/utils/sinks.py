@@ -0,0 +1,255 @@
+"""
+Weather Data Sinks
+This module writes processed weather data to its destinations:
+- csv: Legacy single CSV file (utils.etl.load)
+- parquet: Dataset partitioned by date and city, with compaction of small hourly files
+- postgres: Bulk COPY into processed_weather_data with idempotent upserts
+"""
+
+import io
+import uuid
+import hashlib
+import logging
+import posixpath
+import urllib.parse
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date, timedelta
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple
+
+from instrumentation import instrument_stage, stage
+from utils.etl import load
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SINKS = ['csv']
+# Sinks run in this order whatever the order of SINKS.ENABLED: the idempotent
+# upsert first, so a failure there never leaves rows in the file sinks that a
+# task retry would then write again
+SINK_ORDER = ['postgres', 'parquet', 'csv']
+DEFAULT_PARQUET_PATH = 'WeatherDataPipeline/processed'
+# Open (current-day) partitions are compacted once they hold this many files
+DEFAULT_COMPACT_MIN_FILES = 24
+
+PARTITION_COLUMNS = ['date', 'city']
+
+PROCESSED_COLUMNS = [
+    'city', 'event_timestamp', 'processing_timestamp', 'data_lag',
+    'temperature', 'temperature_fahrenheit', 'feels_like', 'humidity',
+    'pressure', 'wind_speed', 'wind_speed_mph', 'description',
+    'temp_category', 'is_daytime', 'weather_severity', 'hour', 'day_of_week'
+]
+
+
+def _batch_id(df: pd.DataFrame) -> str:
+    """Stable identifier of a batch, derived from its rows."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
+
+def write_parquet_dataset(df: pd.DataFrame, base_path: str, storage_options: Dict[str, Any] = None) -> None:
+    """
+    Append processed data to a Parquet dataset partitioned by date and city.
+    
+    Each call adds one new file per touched partition; readers can prune with
+    e.g. pd.read_parquet(base_path, filters=[('date', '=', '2025-01-31')]).
+    File names are derived from the batch content, so writing the same batch
+    again (e.g. on a task retry) replaces its files instead of duplicating rows.
+    
+    Args:
+        df: Processed weather data
+        base_path: Dataset root (local path or fsspec URL)
+        storage_options: Optional fsspec storage options
+    """
+    partitioned = df.assign(date=pd.to_datetime(df['event_timestamp']).dt.strftime('%Y-%m-%d'))
+    partitioned.to_parquet(
+        base_path,
+        index=False,
+        partition_cols=PARTITION_COLUMNS,
+        storage_options=storage_options or None,
+        basename_template=f"batch-{_batch_id(df)}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    logger.info(f"Appended {len(df)} rows to Parquet dataset {base_path}")
+
+
+def batch_partitions(df: pd.DataFrame) -> Set[Tuple[str, str]]:
+    """
+    Return the (date, city) partitions a batch writes to, plus the previous day
+    of each, so partitions closed by a day rollover are compacted once.
+    
+    Args:
+        df: Processed weather data
+        
+    Returns:
+        Set of (YYYY-MM-DD, city) pairs
+    """
+    pairs = set(zip(pd.to_datetime(df['event_timestamp']).dt.date, df['city']))
+    return {
+        (day.isoformat(), city)
+        for batch_day, city in pairs
+        for day in (batch_day, batch_day - timedelta(days=1))
+    }
+
+
+def compact_partitions(base_path: str, partitions: Optional[Iterable[Tuple[str, str]]] = None,
+                       min_files: int = DEFAULT_COMPACT_MIN_FILES,
+                       storage_options: Dict[str, Any] = None) -> int:
+    """
+    Merge the small hourly files of each partition into a single file.
+    
+    Closed partitions (dates before today) are compacted as soon as they hold
+    more than one file; the current day's partitions once they reach min_files.
+    
+    Args:
+        base_path: Dataset root (local path or fsspec URL)
+        partitions: (date, city) pairs to consider, e.g. from batch_partitions;
+            None scans every partition of the dataset
+        min_files: File count that triggers compaction of open partitions
+        storage_options: Optional fsspec storage options
+        
+    Returns:
+        Number of partitions compacted
+    """
+    fs, root = fsspec.core.url_to_fs(base_path, **(storage_options or {}))
+    today = date.today().isoformat()
+    compacted = 0
+
+    if partitions is None:
+        candidates = [
+            (posixpath.basename(posixpath.dirname(path)).split('=', 1)[1], path)
+            for path in fs.glob(posixpath.join(root, 'date=*', 'city=*'))
+        ]
+    else:
+        # Partition directories hold URL-encoded values, as written by pyarrow
+        candidates = [
+            (partition_date, posixpath.join(root, f"date={partition_date}",
+                                            f"city={urllib.parse.quote(city, safe='')}"))
+            for partition_date, city in sorted(partitions)
+        ]
+
+    for partition_date, partition in candidates:
+        if not fs.isdir(partition):
+            continue
+        files = sorted(fs.glob(posixpath.join(partition, '*.parquet')))
+        threshold = 2 if partition_date < today else min_files
+        if len(files) < threshold:
+            continue
+
+        tables = []
+        for path in files:
+            with fs.open(path, 'rb') as f:
+                tables.append(pq.read_table(f))
+        merged = pa.concat_tables(tables, promote_options='default')
+
+        # Write the merged file before removing the originals so no data is lost on failure
+        target = posixpath.join(partition, f"compacted-{uuid.uuid4().hex}.parquet")
+        with fs.open(target, 'wb') as f:
+            pq.write_table(merged, f)
+        fs.rm(files)
+        compacted += 1
+        logger.info(f"Compacted {len(files)} files in {partition}")
+
+    return compacted
+
+
+def _copy_buffer(df: pd.DataFrame) -> io.StringIO:
+    """Render processed rows as CSV in the column order of PROCESSED_COLUMNS for COPY."""
+    out = df[PROCESSED_COLUMNS].copy()
+    out['data_lag'] = pd.to_timedelta(out['data_lag']).dt.total_seconds().astype(str) + ' seconds'
+    out['temp_category'] = out['temp_category'].astype(str)
+    buffer = io.StringIO()
+    out.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    return buffer
+
+
+@instrument_stage('weather', 'load_postgres')
+def upsert_processed_weather(df: pd.DataFrame, database: Any) -> None:
+    """
+    Bulk-load processed data into processed_weather_data.
+    
+    Rows are streamed with COPY into a temporary table and merged with
+    INSERT ... ON CONFLICT (city, event_timestamp), so reloading a batch
+    updates rows instead of duplicating them.
+    
+    Args:
+        df: Processed weather data
+        database: Database connection object
+        
+    Raises:
+        Exception: If the bulk load fails
+    """
+    if df.empty:
+        logger.info("No rows to load into processed_weather_data")
+        return
+
+    columns = ', '.join(PROCESSED_COLUMNS)
+    updates = ', '.join(
+        f"{column} = EXCLUDED.{column}"
+        for column in PROCESSED_COLUMNS if column not in ('city', 'event_timestamp')
+    )
+    raw_connection = database.engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE processed_weather_load "
+                "(LIKE processed_weather_data INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.copy_expert(
+                f"COPY processed_weather_load ({columns}) FROM STDIN WITH (FORMAT csv)",
+                _copy_buffer(df)
+            )
+            cursor.execute(f"""
+                INSERT INTO processed_weather_data ({columns})
+                SELECT DISTINCT ON (city, event_timestamp) {columns}
+                FROM processed_weather_load
+                ORDER BY city, event_timestamp, processing_timestamp DESC
+                ON CONFLICT (city, event_timestamp) DO UPDATE SET {updates}
+            """)
+        raw_connection.commit()
+        logger.info(f"Upserted {len(df)} rows into processed_weather_data")
+    except Exception as e:
+        raw_connection.rollback()
+        logger.error(f"Error bulk loading processed_weather_data: {e}")
+        raise
+    finally:
+        raw_connection.close()
+
+
+@instrument_stage('weather', 'load')
+def write_sinks(df: pd.DataFrame, config: Dict[str, Any], database: Any) -> None:
+    """
+    Write processed data to every sink listed in SINKS.ENABLED, in SINK_ORDER.
+    
+    Args:
+        df: Processed weather data
+        config: Configuration dictionary
+        database: Database connection object
+        
+    Raises:
+        ValueError: If an unknown sink is configured
+    """
+    sinks_config = config.get('SINKS') or {}
+    storage_options = config.get('STORAGE_OPTIONS') or {}
+    enabled: List[str] = sinks_config.get('ENABLED', DEFAULT_SINKS)
+    unknown = [sink for sink in enabled if sink not in SINK_ORDER]
+    if unknown:
+        raise ValueError(f"Unknown sink: {unknown[0]}")
+
+    for sink in sorted(enabled, key=SINK_ORDER.index):
+        if sink == 'csv':
+            load(df=df, output_path=config['PATHS']['ETL_OUTPUT_PATH'])
+        elif sink == 'parquet':
+            base_path = sinks_config.get('PARQUET_PATH', DEFAULT_PARQUET_PATH)
+            # Timed here rather than on write_parquet_dataset, which the rolling analytics also use
+            with stage('weather', 'load_parquet', rows_in=len(df),
+                       bytes_in=int(df.memory_usage(index=True).sum())):
+                write_parquet_dataset(df, base_path, storage_options)
+                compact_partitions(base_path, batch_partitions(df),
+                                   sinks_config.get('COMPACT_MIN_FILES', DEFAULT_COMPACT_MIN_FILES),
+                                   storage_options)
+        elif sink == 'postgres':
+            upsert_processed_weather(df, database)
@@ -0,0 +1,106 @@
+"""
+Staging Table Writer
+Writes weather records into the staging table in batches with
+psycopg2's execute_values, using a column list reflected once per process.
+Records can be added one at a time (e.g. as async fetches complete) and are
+flushed every `batch_size` rows inside a single transaction.
+"""
+
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+from psycopg2.extras import execute_values
+from sqlalchemy import Table, MetaData
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = 'stagging_weather_data'
+DEFAULT_BATCH_SIZE = 500
+
+# Reflected column lists, keyed by (engine URL, table name)
+_table_columns: Dict[tuple, List[str]] = {}
+_table_columns_lock = threading.Lock()
+
+
+def get_table_columns(engine: Any, table_name: str = STAGING_TABLE) -> List[str]:
+    """
+    Return the column names of a table, reflecting it only on first use per process.
+    
+    Args:
+        engine: SQLAlchemy engine
+        table_name: Name of the table
+        
+    Returns:
+        List of column names in table order
+    """
+    key = (str(engine.url), table_name)
+    with _table_columns_lock:
+        columns = _table_columns.get(key)
+        if columns is None:
+            table = Table(table_name, MetaData(), autoload_with=engine)
+            columns = [column.name for column in table.columns]
+            _table_columns[key] = columns
+            logger.info(f"Reflected schema of {table_name}: {columns}")
+        return columns
+
+
+class StagingWriter:
+    """Batched writer for the staging table; use as a context manager."""
+
+    def __init__(self, database: Any, table_name: str = STAGING_TABLE, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            database: Database connection object
+            table_name: Name of the staging table
+            batch_size: Rows buffered before each execute_values round trip
+        """
+        self.database = database
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._columns: Optional[List[str]] = None
+        self._connection = None
+
+    def __enter__(self) -> 'StagingWriter':
+        self._connection = self.database.engine.raw_connection()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+                self._connection.commit()
+                logger.info(f"Successfully inserted {self.rows_written} records into staging table")
+            else:
+                self._connection.rollback()
+                logger.error(f"Error inserting data into the database: {exc}")
+        finally:
+            self._connection.close()
+            self._connection = None
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Buffer one record, flushing when the batch is full."""
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, records: List[Dict[str, Any]]) -> None:
+        """Buffer several records."""
+        for record in records:
+            self.add(record)
+
+    def flush(self) -> None:
+        """Write buffered records with a single execute_values call."""
+        if not self._buffer:
+            return
+        if self._columns is None:
+            table_columns = get_table_columns(self.database.engine, self.table_name)
+            self._columns = [column for column in table_columns if column in self._buffer[0]]
+
+        rows = [tuple(record.get(column) for column in self._columns) for record in self._buffer]
+        query = f"INSERT INTO {self.table_name} ({', '.join(self._columns)}) VALUES %s"
+        with self._connection.cursor() as cursor:
+            execute_values(cursor, query, rows, page_size=self.batch_size)
+        self.rows_written += len(rows)
+        self._buffer = []
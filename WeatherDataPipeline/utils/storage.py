@@ -0,0 +1,81 @@
+"""
+Intermediate Storage Utilities
+Hands DataFrames between DAG tasks as Parquet files on a local path or an
+object store (any fsspec URL, e.g. s3://bucket/prefix). Only a small reference
+dictionary travels through XCom, and dtypes (timestamps, timedeltas,
+categories) survive the round trip.
+"""
+
+import logging
+import posixpath
+import fsspec
+import pandas as pd
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERMEDIATE_PATH = 'WeatherDataPipeline/intermediate'
+
+
+def _base_path(config: Dict[str, Any]) -> str:
+    return config['PATHS'].get('INTERMEDIATE_PATH', DEFAULT_INTERMEDIATE_PATH).rstrip('/')
+
+
+def _storage_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    return config.get('STORAGE_OPTIONS') or {}
+
+
+def write_intermediate(df: pd.DataFrame, config: Dict[str, Any], run_id: str, task_id: str) -> Dict[str, Any]:
+    """
+    Write a task output as Parquet and return a reference for XCom.
+    
+    Args:
+        df: Task output
+        config: Configuration dictionary
+        run_id: Airflow run id, used to keep runs apart
+        task_id: Id of the producing task
+        
+    Returns:
+        Dictionary with the file URI and row count
+    """
+    safe_run_id = run_id.replace(':', '_').replace('+', '_')
+    uri = posixpath.join(_base_path(config), safe_run_id, f"{task_id}.parquet")
+    storage_options = _storage_options(config)
+
+    fs, path = fsspec.core.url_to_fs(uri, **storage_options)
+    fs.makedirs(posixpath.dirname(path), exist_ok=True)
+    df.to_parquet(uri, index=False, storage_options=storage_options or None)
+
+    logger.info(f"Wrote {len(df)} rows to intermediate file {uri}")
+    return {'uri': uri, 'format': 'parquet', 'rows': len(df)}
+
+
+def read_intermediate(reference: Dict[str, Any], config: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Read a task output written by write_intermediate.
+    
+    Args:
+        reference: Dictionary returned by write_intermediate
+        config: Configuration dictionary
+        
+    Returns:
+        pandas.DataFrame: Task output with its original dtypes
+    """
+    storage_options = _storage_options(config)
+    df = pd.read_parquet(reference['uri'], storage_options=storage_options or None)
+    logger.info(f"Read {len(df)} rows from intermediate file {reference['uri']}")
+    return df
+
+
+def delete_intermediate(reference: Dict[str, Any], config: Dict[str, Any]) -> None:
+    """
+    Remove an intermediate file once it has been consumed.
+    
+    Args:
+        reference: Dictionary returned by write_intermediate
+        config: Configuration dictionary
+    """
+    fs, path = fsspec.core.url_to_fs(reference['uri'], **_storage_options(config))
+    if fs.exists(path):
+        fs.rm(path)
+        logger.info(f"Deleted intermediate file {reference['uri']}")
@@ -0,0 +1,81 @@
+"""
+Local Weather API Stub Server
+Serves OpenWeatherMap-shaped responses for exercising the extraction code
+without a real API key or quota. Point APP.URL at http://localhost:<port>/data/2.5/weather.
+
+Usage:
+    python -m utils.stub_server --port 8081 --latency 0.2 --failure-rate 0.1
+"""
+
+import math
+import time
+import random
+import asyncio
+import argparse
+from aiohttp import web
+
+
+def create_app(latency: float = 0.0, failure_rate: float = 0.0, rate_limit_per_minute: int = 0,
+               rate_limit_window: float = 60.0) -> web.Application:
+    """
+    Build the stub application.
+    
+    Args:
+        latency: Seconds to wait before each response
+        failure_rate: Fraction of requests answered with HTTP 503
+        rate_limit_per_minute: Requests allowed per rolling window before HTTP 429 (0 disables)
+        rate_limit_window: Length of the rolling rate-limit window in seconds
+        
+    Returns:
+        aiohttp web application
+    """
+    request_times = []
+
+    async def weather(request: web.Request) -> web.Response:
+        city = request.query.get('q')
+        if not city:
+            return web.json_response({'cod': '400', 'message': 'Nothing to geocode'}, status=400)
+
+        now = time.monotonic()
+        if rate_limit_per_minute:
+            request_times[:] = [t for t in request_times if now - t < rate_limit_window]
+            if len(request_times) >= rate_limit_per_minute:
+                # Seconds until the oldest request leaves the window
+                retry_after = max(1, math.ceil(request_times[0] + rate_limit_window - now))
+                return web.json_response({'cod': 429, 'message': 'Rate limit exceeded'},
+                                         status=429, headers={'Retry-After': str(retry_after)})
+            request_times.append(now)
+
+        await asyncio.sleep(latency)
+        if random.random() < failure_rate:
+            return web.json_response({'cod': 503, 'message': 'Service unavailable'}, status=503)
+
+        return web.json_response({
+            'name': city,
+            'dt': int(time.time()) // 600 * 600,
+            'main': {
+                'temp': round(random.uniform(5, 35), 2),
+                'feels_like': round(random.uniform(5, 35), 2),
+                'humidity': random.randint(20, 90),
+                'pressure': random.randint(1000, 1030),
+            },
+            'weather': [{'description': 'clear sky'}],
+            'wind': {'speed': round(random.uniform(0, 10), 2)},
+        })
+
+    app = web.Application()
+    app.router.add_get('/data/2.5/weather', weather)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local OpenWeatherMap stub server')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-per-minute', type=int, default=0)
+    parser.add_argument('--rate-limit-window', type=float, default=60.0)
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.latency, args.failure_rate, args.rate_limit_per_minute, args.rate_limit_window),
+                port=args.port)
@@ -0,0 +1,477 @@
+"""
+Pipeline Stage Instrumentation
+Shared timing and profiling helpers for the pipelines in this repository
+(SalesETL, retail_analysis, movie_rental_analysis, WeatherDataPipeline).
+
+Each instrumented stage records wall time, CPU time, peak RSS during the stage, rows in/out
+and bytes in/out. Finished stages are logged, optionally appended to a JSON
+lines file, and can be exported in the Prometheus text format.
+
+Configuration (environment variables, or configure()):
+- PIPELINE_METRICS_JSONL: append one JSON object per finished stage to this file
+- PIPELINE_METRICS_PROM: write_prometheus() default output file, or a directory
+  to get one file per stage (needed when stages run in separate processes)
+- PIPELINE_PROFILE_STAGES: comma-separated "pipeline.stage" names to profile ("*" for all)
+- PIPELINE_PROFILER: "cprofile" (default) or "pyinstrument"
+- PIPELINE_PROFILE_DIR: directory for profile output (default: "profiles")
+
+Usage:
+    @instrument_stage('weather', 'transform')
+    def transform(...): ...
+
+    with stage('sales', 'load', rows_in=len(df)) as metrics:
+        ...
+        metrics.rows_out = written
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import inspect
+import functools
+import threading
+import contextvars
+from datetime import datetime
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Any, Optional, Callable
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'StageMetrics', 'stage', 'instrument_stage', 'record_stage', 'configure',
+    'get_records', 'clear_records', 'to_prometheus_text', 'write_prometheus', 'write_jsonl',
+]
+
+
+@dataclass
+class StageMetrics:
+    """Metrics of one stage execution."""
+    pipeline: str
+    stage: str
+    started_at: str
+    status: str = 'running'
+    wall_time_s: Optional[float] = None
+    cpu_time_s: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_in: Optional[int] = None
+    bytes_out: Optional[int] = None
+    error: Optional[str] = None
+    profile_path: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+_settings: Dict[str, Any] = {}
+_records: List[StageMetrics] = []
+_records_lock = threading.Lock()
+_current: contextvars.ContextVar = contextvars.ContextVar('current_stage', default=None)
+
+
+def configure(jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None,
+              profile_stages: Optional[List[str]] = None, profiler: Optional[str] = None,
+              profile_dir: Optional[str] = None) -> None:
+    """Override the environment-variable configuration for this process."""
+    for key, value in [('jsonl_path', jsonl_path), ('prometheus_path', prometheus_path),
+                       ('profile_stages', profile_stages), ('profiler', profiler),
+                       ('profile_dir', profile_dir)]:
+        if value is not None:
+            _settings[key] = value
+
+
+def _setting(key: str, env: str, default: Any = None) -> Any:
+    if key in _settings:
+        return _settings[key]
+    return os.environ.get(env, default)
+
+
+# Interval of the psutil RSS polling thread used where /proc/self/clear_refs is unavailable
+RSS_SAMPLE_INTERVAL_S = 0.05
+
+_CLEAR_REFS = '/proc/self/clear_refs'
+_PROC_STATUS = '/proc/self/status'
+
+
+def _read_vm_hwm() -> Optional[int]:
+    """Kernel-tracked peak RSS (VmHWM) of the process in bytes, or None."""
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_vm_hwm() -> bool:
+    """Reset VmHWM to the current RSS (Linux >= 4.0); False if not permitted."""
+    try:
+        with open(_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class _PeakRssTracker:
+    """
+    Peak RSS of each active stage.
+    
+    On Linux the kernel's high-water mark is reset when a stage starts and read
+    when it ends. Before every reset the current mark is folded into all
+    active stages, so nested and concurrent stages keep their own peaks.
+    Elsewhere a psutil thread samples RSS while any stage is active. Without
+    either source peaks are reported as None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._peaks: Dict[int, int] = {}
+        self._next_key = 0
+        self._mode: Optional[str] = None
+        self._stop: Optional[threading.Event] = None
+
+    def _sample(self) -> Optional[int]:
+        if self._mode == 'clear_refs':
+            return _read_vm_hwm()
+        if self._mode == 'psutil':
+            return psutil.Process().memory_info().rss
+        return None
+
+    def _fold(self, value: Optional[int]) -> None:
+        if value is not None:
+            for key, peak in self._peaks.items():
+                self._peaks[key] = max(peak, value)
+
+    def _poll(self, stop: threading.Event) -> None:
+        while not stop.wait(RSS_SAMPLE_INTERVAL_S):
+            with self._lock:
+                self._fold(self._sample())
+
+    def start(self) -> int:
+        """Start tracking a stage; returns the key to pass to stop()."""
+        with self._lock:
+            if self._mode is None:
+                if _read_vm_hwm() is not None and _reset_vm_hwm():
+                    self._mode = 'clear_refs'
+                else:
+                    self._mode = 'psutil' if psutil is not None else 'none'
+            self._fold(self._sample())
+            if self._mode == 'clear_refs':
+                _reset_vm_hwm()
+            elif self._mode == 'psutil' and self._stop is None:
+                self._stop = threading.Event()
+                threading.Thread(target=self._poll, args=(self._stop,), name='peak-rss-sampler',
+                                 daemon=True).start()
+            key = self._next_key
+            self._next_key += 1
+            self._peaks[key] = self._sample() or 0
+            return key
+
+    def stop(self, key: int) -> Optional[int]:
+        """Stop tracking a stage and return its peak RSS in bytes."""
+        with self._lock:
+            self._fold(self._sample())
+            peak = self._peaks.pop(key)
+            if not self._peaks and self._stop is not None:
+                self._stop.set()
+                self._stop = None
+            return peak if self._mode != 'none' else None
+
+
+_peak_rss = _PeakRssTracker()
+
+
+def _size_of(obj: Any) -> tuple:
+    """Best-effort (rows, bytes) of a stage input or output without triggering computation."""
+    if obj is None or isinstance(obj, (str, bytes)):
+        return None, None
+    memory_usage = getattr(obj, 'memory_usage', None)
+    if callable(memory_usage) and hasattr(obj, '__len__'):
+        # pandas DataFrame / Series
+        usage = memory_usage(index=True)
+        return len(obj), int(usage.sum() if hasattr(usage, 'sum') else usage)
+    estimated_size = getattr(obj, 'estimated_size', None)
+    if callable(estimated_size) and hasattr(obj, '__len__'):
+        # polars DataFrame
+        return len(obj), int(estimated_size())
+    if isinstance(obj, (list, tuple, set, dict)):
+        return len(obj), None
+    # Lazy frames (e.g. Spark DataFrames) are not counted: that would run the plan
+    return None, None
+
+
+def _should_profile(pipeline: str, name: str, profile: Optional[bool]) -> bool:
+    if profile is not None:
+        return profile
+    stages = _setting('profile_stages', 'PIPELINE_PROFILE_STAGES', '')
+    if isinstance(stages, str):
+        stages = [s.strip() for s in stages.split(',') if s.strip()]
+    return '*' in stages or f"{pipeline}.{name}" in stages
+
+
+@contextmanager
+def _profiler(metrics: StageMetrics):
+    """Run the block under cProfile or pyinstrument and record where the output went."""
+    kind = _setting('profiler', 'PIPELINE_PROFILER', 'cprofile')
+    profile_dir = _setting('profile_dir', 'PIPELINE_PROFILE_DIR', 'profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, f"{metrics.pipeline}.{metrics.stage}.{datetime.now():%Y%m%dT%H%M%S}")
+
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; falling back to cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                metrics.profile_path = f"{base}.html"
+                with open(metrics.profile_path, 'w') as f:
+                    f.write(profiler.output_html())
+            return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        metrics.profile_path = f"{base}.prof"
+        profiler.dump_stats(metrics.profile_path)
+
+
+def _finish(metrics: StageMetrics) -> None:
+    with _records_lock:
+        _records.append(metrics)
+    logger.info(
+        f"[{metrics.pipeline}.{metrics.stage}] {metrics.status} in {metrics.wall_time_s:.3f}s "
+        f"(cpu {metrics.cpu_time_s:.3f}s, rows {metrics.rows_in} -> {metrics.rows_out}, "
+        f"peak rss {metrics.peak_rss_bytes})"
+    )
+    jsonl_path = _setting('jsonl_path', 'PIPELINE_METRICS_JSONL')
+    if jsonl_path:
+        write_jsonl(jsonl_path, [metrics])
+
+
+@contextmanager
+def stage(pipeline: str, name: str, rows_in: Optional[int] = None, bytes_in: Optional[int] = None,
+          profile: Optional[bool] = None):
+    """
+    Context manager recording the metrics of one stage.
+    
+    Args:
+        pipeline: Pipeline name (e.g. 'weather')
+        name: Stage name (e.g. 'extract')
+        rows_in: Rows entering the stage, if known
+        bytes_in: Bytes entering the stage, if known
+        profile: Force profiling on or off (default: PIPELINE_PROFILE_STAGES)
+        
+    Yields:
+        StageMetrics, whose rows_out/bytes_out/extra the block may fill in
+    """
+    metrics = StageMetrics(pipeline=pipeline, stage=name, started_at=datetime.now().isoformat(),
+                           rows_in=rows_in, bytes_in=bytes_in)
+    token = _current.set(metrics)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    rss_key = _peak_rss.start()
+    try:
+        if _should_profile(pipeline, name, profile):
+            with _profiler(metrics):
+                yield metrics
+        else:
+            yield metrics
+        metrics.status = 'success'
+    except BaseException as e:
+        metrics.status = 'failed'
+        metrics.error = repr(e)
+        raise
+    finally:
+        metrics.wall_time_s = time.perf_counter() - wall_start
+        metrics.cpu_time_s = time.process_time() - cpu_start
+        metrics.peak_rss_bytes = _peak_rss.stop(rss_key)
+        _current.reset(token)
+        _finish(metrics)
+
+
+def instrument_stage(pipeline: str, name: Optional[str] = None, profile: Optional[bool] = None) -> Callable:
+    """
+    Decorator recording a function call as a stage.
+    
+    Rows and bytes in are taken from the first argument, whether passed
+    positionally or by keyword (self/cls excluded), and rows and bytes out from the return value when they are DataFrames or
+    collections; lazy frames are never counted. The function can refine them
+    with record_stage().
+    
+    Args:
+        pipeline: Pipeline name
+        name: Stage name (default: the function name)
+        profile: Force profiling on or off (default: PIPELINE_PROFILE_STAGES)
+    """
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        def first_argument(args, kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+            except TypeError:
+                # Let the call itself raise the error
+                return None
+            for parameter, value in bound.arguments.items():
+                if parameter not in ('self', 'cls'):
+                    return value
+            return None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in, bytes_in = _size_of(first_argument(args, kwargs))
+            with stage(pipeline, stage_name, rows_in=rows_in, bytes_in=bytes_in, profile=profile) as metrics:
+                result = func(*args, **kwargs)
+                rows_out, bytes_out = _size_of(result)
+                if metrics.rows_out is None:
+                    metrics.rows_out = rows_out
+                if metrics.bytes_out is None:
+                    metrics.bytes_out = bytes_out
+                return result
+        return wrapper
+    return decorator
+
+
+def record_stage(**values: Any) -> None:
+    """
+    Set metrics (rows_in, rows_out, bytes_in, bytes_out, or any extra key)
+    on the stage currently running in this context. No-op outside a stage.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+    for key, value in values.items():
+        if key in StageMetrics.__dataclass_fields__ and key != 'extra':
+            setattr(metrics, key, value)
+        else:
+            metrics.extra[key] = value
+
+
+def get_records() -> List[StageMetrics]:
+    """Stage metrics recorded in this process so far."""
+    with _records_lock:
+        return list(_records)
+
+
+def clear_records() -> None:
+    """Forget the stage metrics recorded so far."""
+    with _records_lock:
+        _records.clear()
+
+
+def write_jsonl(path: str, records: Optional[List[StageMetrics]] = None) -> None:
+    """Append stage metrics to a JSON lines file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as f:
+        for metrics in (records if records is not None else get_records()):
+            f.write(json.dumps(asdict(metrics), default=str) + '\n')
+
+
+PROMETHEUS_METRICS = [
+    ('wall_time_s', 'pipeline_stage_wall_time_seconds', 'Wall-clock time of the last stage run'),
+    ('cpu_time_s', 'pipeline_stage_cpu_time_seconds', 'CPU time of the last stage run'),
+    ('peak_rss_bytes', 'pipeline_stage_peak_rss_bytes', 'Peak RSS during the last stage run'),
+    ('rows_in', 'pipeline_stage_rows_in', 'Rows entering the last stage run'),
+    ('rows_out', 'pipeline_stage_rows_out', 'Rows leaving the last stage run'),
+    ('bytes_in', 'pipeline_stage_bytes_in', 'Bytes entering the last stage run'),
+    ('bytes_out', 'pipeline_stage_bytes_out', 'Bytes leaving the last stage run'),
+]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus_text(records: Optional[List[StageMetrics]] = None) -> str:
+    """
+    Render the latest run of each stage in the Prometheus text exposition format
+    (suitable for the node_exporter textfile collector or a Pushgateway).
+    """
+    latest: Dict[tuple, StageMetrics] = {}
+    for metrics in (records if records is not None else get_records()):
+        latest[(metrics.pipeline, metrics.stage)] = metrics
+
+    lines = []
+    for attribute, metric_name, help_text in PROMETHEUS_METRICS:
+        samples = [
+            (key, getattr(metrics, attribute)) for key, metrics in sorted(latest.items())
+            if getattr(metrics, attribute) is not None
+        ]
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric_name} {help_text}")
+        lines.append(f"# TYPE {metric_name} gauge")
+        for (pipeline, stage_name), value in samples:
+            lines.append(f'{metric_name}{{pipeline="{_escape_label(pipeline)}",stage="{_escape_label(stage_name)}"}} {value}')
+
+    success = [(key, 1 if metrics.status == 'success' else 0) for key, metrics in sorted(latest.items())]
+    if success:
+        lines.append("# HELP pipeline_stage_success Whether the last stage run succeeded")
+        lines.append("# TYPE pipeline_stage_success gauge")
+        for (pipeline, stage_name), value in success:
+            lines.append(f'pipeline_stage_success{{pipeline="{_escape_label(pipeline)}",stage="{_escape_label(stage_name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path: Optional[str] = None, records: Optional[List[StageMetrics]] = None) -> Optional[str]:
+    """
+    Write to_prometheus_text() atomically, as the node_exporter textfile collector expects.
+    
+    If `path` is a directory, one "<pipeline>.<stage>.prom" file is written per
+    stage instead, so separate processes (e.g. Airflow tasks) do not overwrite
+    each other's metrics.
+    
+    Args:
+        path: Output file or directory (default: PIPELINE_METRICS_PROM; nothing is written if unset)
+        records: Stage metrics to export (default: all recorded in this process)
+        
+    Returns:
+        The path written, or None
+    """
+    path = path or _setting('prometheus_path', 'PIPELINE_METRICS_PROM')
+    if not path:
+        return None
+    records = records if records is not None else get_records()
+
+    if os.path.isdir(path) or path.endswith(os.sep):
+        os.makedirs(path, exist_ok=True)
+        for metrics in records:
+            _write_atomic(os.path.join(path, f"{metrics.pipeline}.{metrics.stage}.prom"),
+                          to_prometheus_text([metrics]))
+        return path
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _write_atomic(path, to_prometheus_text(records))
+    return path
+
+
+def _write_atomic(path: str, content: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -1,22 +1,35 @@
-from pyspark.sql import SparkSession
+import os
+from instrumentation import stage, write_prometheus
 from utils.config import get_config
+from utils.spark_session import get_spark
 from utils.common_pyspark import read_table_database
+from utils.export import pivot_collect, export_result
+from utils import postgres_engine
+from utils.spark_metrics import AnalysisProfiler
 from pyspark.sql.functions import sum, year, coalesce, lit, col, count
 import matplotlib.pyplot as plt
-import pandas as pd
 from pyspark.sql import functions as F
 from pyspark.sql.window import Window
 
-# Load configuration and initialize Spark session
-conf = get_config()
-spark = SparkSession.builder.appName('testing') \
-     .config('spark.jars', conf['pyspark']['JDBC_DRIVER_PATH']).getOrCreate()
-
-def analyze_store_revenue(spark):
+def analyze_store_revenue(spark=None, engine=None, plot=True):
     """
     Reads data from a database, aggregates total revenue per store per year, 
     and generates a bar chart comparing stores' revenues per year.
+
+    :param spark: SparkSession object (created lazily if needed and not given)
+    :param engine: 'auto', 'spark' or 'postgres' (default: from config.yaml)
+    :param plot: Whether to draw the bar chart (default: True)
+    :return: DataFrame with columns store_id, year, total_money
+             (Spark DataFrame for the Spark engine, pandas DataFrame for Postgres)
     """
+    if postgres_engine.choose_engine(postgres_engine.STORE_REVENUE_TABLES, engine) == 'postgres':
+        results_df = postgres_engine.store_revenue()
+        if plot:
+            plot_store_revenue(results_df)
+        return results_df
+
+    spark = spark or get_spark()
+
     # Read data from database
     payment = read_table_database(spark, 'payment')
     staff = read_table_database(spark, 'staff')
@@ -33,18 +46,25 @@ def analyze_store_revenue(spark):
                     .agg(sum('amount').alias('total_money'))
                     .orderBy("year", "store_id"))
 
-    # Convert PySpark DataFrame to Pandas for plotting
-    pdf = results_df.toPandas()
+    if plot:
+        plot_store_revenue(results_df)
 
-    # Ensure 'year' and 'total_money' are numeric
-    pdf["year"] = pd.to_numeric(pdf["year"], errors="coerce")
-    pdf["total_money"] = pd.to_numeric(pdf["total_money"], errors="coerce")
+    return results_df  # Return DataFrame for further analysis if needed
+
+def plot_store_revenue(results_df):
+    """
+    Plots a bar chart comparing stores' revenues per year.
 
-    # Pivot DataFrame for bar chart (Make sure values are numeric)
-    pivot_df = pdf.pivot(index="year", columns="store_id", values="total_money").fillna(0)
-    pivot_df = pivot_df.apply(pd.to_numeric)
+    :param results_df: Store revenue result (Spark or pandas DataFrame with
+                       columns store_id, year, total_money)
+    """
+    if hasattr(results_df, 'sparkSession'):
+        # Pivot in Spark and collect only the plot-ready table via Arrow
+        pivot_df = pivot_collect(results_df, index="year", columns="store_id", values="total_money")
+    else:
+        pivot_df = results_df.pivot(index="year", columns="store_id", values="total_money") \
+                             .fillna(0).astype('float64')
 
-    # Plot bar chart
     pivot_df.plot(kind="bar", figsize=(10, 6))
     plt.xlabel("Year")
     plt.ylabel("Total Revenue")
@@ -53,16 +73,20 @@ def analyze_store_revenue(spark):
     plt.grid(axis='y', linestyle='--', alpha=0.7)
     plt.show()
 
-    return results_df  # Return DataFrame for further analysis if needed
-
-def get_actor_revenue(spark, year_filter=2005):
+def get_actor_revenue(spark=None, year_filter=2005, engine=None):
     """
     Retrieves total revenue per actor for a given year from the movie rental database.
     
-    :param spark: SparkSession object
+    :param spark: SparkSession object (created lazily if needed and not given)
     :param year_filter: Year to filter the payment data (default: 2005)
+    :param engine: 'auto', 'spark' or 'postgres' (default: from config.yaml)
     :return: DataFrame with actor names and their total revenue
     """
+    if postgres_engine.choose_engine(postgres_engine.ACTOR_REVENUE_TABLES, engine) == 'postgres':
+        return postgres_engine.actor_revenue(year_filter)
+
+    spark = spark or get_spark()
+
     # Read tables from the database
     payment = read_table_database(spark, 'payment')
     actor = read_table_database(spark, 'actor')
@@ -92,14 +116,20 @@ def get_actor_revenue(spark, year_filter=2005):
     
     return results
 
-def get_top_movie_each_month(spark, release_year=None):
+def get_top_movie_each_month(spark=None, release_year=None, engine=None):
     """
     Retrieves the film with the highest total revenue for each month (and year).
     
-    :param spark: SparkSession object
+    :param spark: SparkSession object (created lazily if needed and not given)
     :param release_year: Optionally filter by a specific year (default: None, which means all years)
+    :param engine: 'auto', 'spark' or 'postgres' (default: from config.yaml)
     :return: DataFrame with columns: year, month, film_name, total_revenue
     """
+    if postgres_engine.choose_engine(postgres_engine.TOP_MOVIE_TABLES, engine) == 'postgres':
+        return postgres_engine.top_movie_each_month(release_year)
+
+    spark = spark or get_spark()
+
     # Read tables from the database
     payment = read_table_database(spark, 'payment')
     rental = read_table_database(spark, 'rental')
@@ -139,19 +169,88 @@ def get_top_movie_each_month(spark, release_year=None):
     
     return top_movies_df.select("year", "month", "film_name", "total_revenue")
 
+def run_analysis(profiler, name, analysis, *args, **kwargs):
+    """
+    Runs an analysis as the 'movie_rental.<name>' stage, materializing its result within it.
+
+    Spark analyses only build a lazy plan, so the result is cached and counted
+    inside the stage; the show and export steps then read the cached rows.
+    When the profiler is enabled its no-op write runs inside the stage as well.
+
+    :param profiler: AnalysisProfiler wrapping the analysis
+    :param name: Stage and analysis name
+    :param analysis: Analysis function
+    :return: Materialized Spark DataFrame or pandas DataFrame
+    """
+    with stage('movie_rental', name) as metrics:
+        result_df = profiler.run(name, analysis, *args, **kwargs)
+        if hasattr(result_df, 'sparkSession'):
+            result_df = result_df.cache()
+            metrics.rows_out = result_df.count()
+        else:
+            metrics.rows_out = len(result_df)
+    return result_df
+
+def show_result(result_df, n=10):
+    """
+    Prints the first rows of a Spark or pandas result.
+    """
+    if hasattr(result_df, 'show'):
+        result_df.show(n)
+    else:
+        print(result_df.head(n).to_string(index=False))
+
 # Execute all functions when running the file
 if __name__ == "__main__":
-    # 1. Analyze store revenue and display the bar chart
-    store_revenue_df = analyze_store_revenue(spark)
+    # Spark is only started if an analysis is routed to the Spark engine, in its own
+    # stage so JVM startup is not attributed to the first analysis
+    spark = None
+    analysis_tables = [postgres_engine.STORE_REVENUE_TABLES, postgres_engine.ACTOR_REVENUE_TABLES,
+                       postgres_engine.TOP_MOVIE_TABLES]
+    if any(postgres_engine.choose_engine(tables) == 'spark' for tables in analysis_tables):
+        with stage('movie_rental', 'spark_session'):
+            spark = get_spark()
+
+    # Per-analysis metrics are recorded when metrics.ENABLED is set in config.yaml
+    metrics_conf = get_config().get('metrics') or {}
+    profiler = AnalysisProfiler(enabled=metrics_conf.get('ENABLED', False))
+
+    # 1. Analyze store revenue and display the bar chart. The chart is drawn outside
+    #    the profiler so the time its window stays open is not measured.
+    store_revenue_df = run_analysis(profiler, 'store_revenue', analyze_store_revenue, spark, plot=False)
+    plot_store_revenue(store_revenue_df)
     print("Store Revenue DataFrame:")
-    store_revenue_df.show(10)
+    show_result(store_revenue_df)
     
     # 2. Get actor revenue for year 2005 and show results
-    actor_revenue_df = get_actor_revenue(spark, year_filter=2005)
+    actor_revenue_df = run_analysis(profiler, 'actor_revenue', get_actor_revenue, spark, year_filter=2005)
     print("Actor Revenue DataFrame for 2005:")
-    actor_revenue_df.show(10)
+    show_result(actor_revenue_df)
     
     # 3. Get top movie each month (across all years)
-    top_movie_df = get_top_movie_each_month(spark)
+    top_movie_df = run_analysis(profiler, 'top_movie_each_month', get_top_movie_each_month, spark)
     print("Top Movie Each Month DataFrame:")
-    top_movie_df.show(10)
+    show_result(top_movie_df)
+
+    # 4. Export every result to {RESULTS_DIR}/{name} as a Parquet dataset directory
+    output_dir = (get_config().get('output') or {}).get('RESULTS_DIR')
+    if output_dir:
+        for name, result_df in [('store_revenue', store_revenue_df),
+                                ('actor_revenue', actor_revenue_df),
+                                ('top_movie_each_month', top_movie_df)]:
+            with stage('movie_rental', f'export_{name}') as export_metrics:
+                path = export_result(result_df, os.path.join(output_dir, name))
+                if not hasattr(result_df, 'sparkSession'):
+                    export_metrics.rows_out = len(result_df)
+                print(f"Exported {name} to {path}")
+
+    # 5. Write the run report and flag regressions against the stored baseline
+    if profiler.enabled:
+        profiler.write_report(metrics_conf.get('REPORT_PATH', 'metrics/run_report.json'))
+        baseline_path = metrics_conf.get('BASELINE_PATH', 'metrics/baseline.json')
+        for regression in profiler.find_regressions(baseline_path, metrics_conf.get('REGRESSION_TOLERANCE', 0.2)):
+            print(f"REGRESSION {regression['analysis']}.{regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.0%})")
+
+    # 6. Export per-stage timings (PIPELINE_METRICS_PROM) for this run
+    write_prometheus()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('pyspark')
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('matplotlib')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (analysis in main.py, keyword arguments, columns that uniquely order the rows)
+ANALYSES = [
+    ('analyze_store_revenue', {'plot': False}, ['year', 'store_id']),
+    ('get_actor_revenue', {'year_filter': 2005}, ['first_name', 'last_name']),
+    ('get_top_movie_each_month', {}, ['year', 'month', 'film_name']),
+]
+
+
+@pytest.fixture(scope='module')
+def main_module():
+    """Import main with config.yaml resolvable, skipping when Postgres or Spark is unavailable."""
+    if not os.path.exists(os.path.join(PROJECT_ROOT, 'config.yaml')):
+        pytest.skip('config.yaml not found')
+
+    cwd = os.getcwd()
+    os.chdir(PROJECT_ROOT)
+    try:
+        import main
+        from sqlalchemy import text
+        from utils import postgres_engine
+        from utils.spark_session import get_spark, stop_spark
+
+        try:
+            with postgres_engine.get_engine().connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            pytest.skip(f'Postgres unavailable: {e}')
+        try:
+            get_spark()
+        except Exception as e:
+            pytest.skip(f'Spark unavailable: {e}')
+
+        yield main
+        stop_spark()
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize('name, kwargs, sort_by', ANALYSES, ids=[a[0] for a in ANALYSES])
+def test_spark_and_postgres_results_match(main_module, name, kwargs, sort_by):
+    from utils import postgres_engine
+
+    analysis = getattr(main_module, name)
+    postgres_engine.assert_results_equal(
+        analysis(engine='spark', **kwargs),
+        analysis(engine='postgres', **kwargs),
+        sort_by,
+    )
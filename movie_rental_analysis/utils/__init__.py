@@ -1,3 +1,7 @@
 # utils/__init__.py
 from . import config
-from . import common_pyspark
\ No newline at end of file
+from . import common_pyspark
+from . import spark_session
+from . import export
+from . import postgres_engine
+from . import spark_metrics
\ No newline at end of file
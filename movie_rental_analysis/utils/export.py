@@ -0,0 +1,124 @@
+import os
+import shutil
+from contextlib import contextmanager
+
+from pyspark.sql import functions as F
+from pyspark.sql.types import DecimalType, DoubleType
+
+
+ARROW_CONF = 'spark.sql.execution.arrow.pyspark.enabled'
+ARROW_BATCH_CONF = 'spark.sql.execution.arrow.maxRecordsPerBatch'
+
+
+@contextmanager
+def arrow_enabled(spark, max_records_per_batch=10_000):
+    """
+    Temporarily enables Arrow-batched transfer between the JVM and the driver.
+
+    :param spark: SparkSession object
+    :param max_records_per_batch: Rows per Arrow record batch
+    """
+    previous = {key: spark.conf.get(key, None) for key in (ARROW_CONF, ARROW_BATCH_CONF)}
+    spark.conf.set(ARROW_CONF, 'true')
+    spark.conf.set(ARROW_BATCH_CONF, str(max_records_per_batch))
+    try:
+        yield spark
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                spark.conf.unset(key)
+            else:
+                spark.conf.set(key, value)
+
+
+def decimals_to_double(df):
+    """
+    Casts DecimalType columns to double inside Spark, so the collected pandas
+    columns are float64 instead of object columns of decimal.Decimal.
+
+    :param df: Spark DataFrame
+    :return: Spark DataFrame with decimal columns cast to double
+    """
+    return df.select([
+        F.col(field.name).cast(DoubleType()).alias(field.name)
+        if isinstance(field.dataType, DecimalType) else F.col(field.name)
+        for field in df.schema.fields
+    ])
+
+
+def collect_pandas(df, decimals_as_float=False):
+    """
+    Collects a Spark DataFrame to pandas using Arrow-batched transfer.
+
+    Column types are preserved: integers stay integers and decimals stay
+    decimal.Decimal unless decimals_as_float is set.
+
+    :param df: Spark DataFrame
+    :param decimals_as_float: Cast decimal columns to double before collecting
+    :return: pandas DataFrame
+    """
+    if decimals_as_float:
+        df = decimals_to_double(df)
+    with arrow_enabled(df.sparkSession):
+        return df.toPandas()
+
+
+def pivot_collect(df, index, columns, values, pivot_values=None, decimals_as_float=True):
+    """
+    Pivots a Spark DataFrame in Spark and collects only the plot-ready result.
+
+    :param df: Spark DataFrame in long format
+    :param index: Column that becomes the pandas index
+    :param columns: Column whose distinct values become the output columns
+    :param values: Column summed into each cell
+    :param pivot_values: Optional list of pivot values (skips the extra distinct job)
+    :param decimals_as_float: Cast decimal columns to double before collecting
+    :return: pandas DataFrame indexed by `index` with one column per pivot value
+    """
+    pivoted = (df.groupBy(index)
+                 .pivot(columns, pivot_values)
+                 .agg(F.sum(values))
+                 .fillna(0)
+                 .orderBy(index))
+
+    pdf = collect_pandas(pivoted, decimals_as_float=decimals_as_float).set_index(index)
+    pdf.columns.name = columns
+    return pdf
+
+
+def write_parquet(df, path, mode='overwrite', partition_by=None):
+    """
+    Streams a Spark DataFrame to Parquet from the executors, bypassing the driver.
+
+    :param df: Spark DataFrame
+    :param path: Output directory (local path or object-store URI)
+    :param mode: Spark save mode (default: overwrite)
+    :param partition_by: Optional list of partition columns
+    :return: The output path
+    """
+    writer = df.write.mode(mode)
+    if partition_by:
+        writer = writer.partitionBy(*partition_by)
+    writer.parquet(path)
+    return path
+
+
+def export_result(result, path):
+    """
+    Writes an analysis result to a Parquet dataset directory.
+
+    Spark results stream from the executors with write_parquet. pandas results
+    (Postgres engine) are written as a single part file in the same directory
+    layout, so readers find every result at the same path whichever engine ran it.
+
+    :param result: Spark DataFrame or pandas DataFrame
+    :param path: Output directory (replaced if it exists)
+    :return: The output path
+    """
+    if hasattr(result, 'sparkSession'):
+        return write_parquet(result, path)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    result.to_parquet(os.path.join(path, 'part-00000.parquet'), index=False)
+    return path
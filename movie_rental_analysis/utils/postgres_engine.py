@@ -0,0 +1,213 @@
+import pandas as pd
+from sqlalchemy import create_engine, text
+from utils.config import get_config
+
+
+# Workloads whose tables hold fewer rows than this in total run as pushed-down
+# Postgres SQL; larger ones go to Spark. Overridable via engine.SMALL_WORKLOAD_ROWS.
+DEFAULT_SMALL_WORKLOAD_ROWS = 5_000_000
+
+ENGINES = ('auto', 'spark', 'postgres')
+
+STORE_REVENUE_TABLES = ['payment', 'staff', 'store']
+ACTOR_REVENUE_TABLES = ['payment', 'actor', 'film_actor', 'film', 'inventory', 'rental']
+TOP_MOVIE_TABLES = ['payment', 'rental', 'inventory', 'film']
+
+STORE_REVENUE_SQL = """
+    SELECT st.store_id,
+           EXTRACT(YEAR FROM p.payment_date)::int AS year,
+           SUM(p.amount) AS total_money
+    FROM payment p
+    JOIN staff s ON s.staff_id = p.staff_id
+    JOIN store st ON st.store_id = s.store_id
+    GROUP BY st.store_id, year
+    ORDER BY year, st.store_id
+"""
+
+ACTOR_REVENUE_SQL = """
+    SELECT a.first_name,
+           a.last_name,
+           COALESCE(SUM(p.amount), 0) AS total_revenue
+    FROM actor a
+    JOIN film_actor fa ON fa.actor_id = a.actor_id
+    JOIN film f ON f.film_id = fa.film_id
+    JOIN inventory i ON i.film_id = f.film_id
+    JOIN rental r ON r.inventory_id = i.inventory_id
+    JOIN payment p ON p.rental_id = r.rental_id
+    WHERE p.payment_date >= make_timestamp(:year_filter, 1, 1, 0, 0, 0)
+      AND p.payment_date < make_timestamp(:year_filter + 1, 1, 1, 0, 0, 0)
+    GROUP BY a.first_name, a.last_name
+    ORDER BY total_revenue DESC
+"""
+
+TOP_MOVIE_SQL = """
+    WITH monthly AS (
+        SELECT EXTRACT(YEAR FROM p.payment_date)::int AS year,
+               EXTRACT(MONTH FROM p.payment_date)::int AS month,
+               f.title AS film_name,
+               SUM(p.amount) AS total_revenue
+        FROM payment p
+        JOIN rental r ON r.rental_id = p.rental_id
+        JOIN inventory i ON i.inventory_id = r.inventory_id
+        JOIN film f ON f.film_id = i.film_id
+        WHERE CAST(:release_year AS int) IS NULL
+           OR (p.payment_date >= make_timestamp(:release_year, 1, 1, 0, 0, 0)
+               AND p.payment_date < make_timestamp(:release_year + 1, 1, 1, 0, 0, 0))
+        GROUP BY year, month, f.title
+    ),
+    ranked AS (
+        SELECT year, month, film_name, total_revenue,
+               RANK() OVER (PARTITION BY year, month ORDER BY total_revenue DESC) AS rev_rank
+        FROM monthly
+    )
+    SELECT year, month, film_name, total_revenue
+    FROM ranked
+    WHERE rev_rank = 1
+    ORDER BY year, month
+"""
+
+_engine = None
+
+
+def get_engine():
+    """
+    Returns a process-wide SQLAlchemy engine for the movie rental database.
+    """
+    global _engine
+    if _engine is None:
+        db = get_config()['database']
+        _engine = create_engine(
+            f"postgresql+psycopg2://{db['DB_USER']}:{db['DB_PASSWORD']}@{db['DB_HOST']}:{db['DB_PORT']}/{db['DB_NAME']}"
+        )
+    return _engine
+
+
+def run_query(sql, params=None):
+    """
+    Runs a SQL query in Postgres and returns the result as a pandas DataFrame.
+
+    :param sql: SQL text with :named parameters
+    :param params: Dict of parameter values
+    :return: pandas DataFrame
+    """
+    with get_engine().connect() as connection:
+        return pd.read_sql(text(sql), connection, params=params or {})
+
+
+def estimate_rows(tables):
+    """
+    Estimates the total number of rows in the given tables from planner statistics.
+
+    Inheritance children and partitions (e.g. payment_p2007_*) are included,
+    since the parent's own reltuples does not count their rows. If any relation
+    has never been analyzed (reltuples < 0) the size is unknown and None is
+    returned, rather than running a full COUNT(*) just to pick an engine.
+
+    :param tables: List of table names
+    :return: Estimated total row count, or None if a table has no statistics
+    """
+    query = text("""
+        WITH RECURSIVE tree AS (
+            SELECT c.oid, c.relname AS root
+            FROM pg_class c
+            WHERE c.relname = ANY(:tables) AND c.relkind IN ('r', 'p')
+            UNION ALL
+            SELECT i.inhrelid, t.root
+            FROM pg_inherits i
+            JOIN tree t ON i.inhparent = t.oid
+        )
+        SELECT t.root,
+               SUM(GREATEST(c.reltuples, 0))::bigint AS estimate,
+               BOOL_OR(c.reltuples < 0) AS unanalyzed
+        FROM tree t
+        JOIN pg_class c ON c.oid = t.oid
+        GROUP BY t.root
+    """)
+    with get_engine().connect() as connection:
+        estimates = {root: (estimate, unanalyzed) for root, estimate, unanalyzed
+                     in connection.execute(query, {"tables": list(tables)}).fetchall()}
+    total = 0
+    for table in tables:
+        estimate, unanalyzed = estimates.get(table, (0, True))
+        if unanalyzed:
+            return None
+        total += estimate
+    return total
+
+
+def choose_engine(tables, engine='auto'):
+    """
+    Resolves which engine should run an analysis.
+
+    :param tables: Tables read by the analysis
+    :param engine: 'auto', 'spark' or 'postgres' (default: engine.ENGINE from config.yaml, else 'auto')
+    :return: 'spark' or 'postgres'
+    """
+    engine_conf = get_config().get('engine') or {}
+    engine = engine or engine_conf.get('ENGINE', 'auto')
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    if engine != 'auto':
+        return engine
+
+    threshold = engine_conf.get('SMALL_WORKLOAD_ROWS', DEFAULT_SMALL_WORKLOAD_ROWS)
+    rows = estimate_rows(tables)
+    # Tables without statistics are treated as large
+    return 'postgres' if rows is not None and rows < threshold else 'spark'
+
+
+def store_revenue():
+    """
+    Total revenue per store per year, computed in Postgres.
+
+    :return: pandas DataFrame with columns store_id, year, total_money
+    """
+    return run_query(STORE_REVENUE_SQL)
+
+
+def actor_revenue(year_filter=2005):
+    """
+    Total revenue per actor for a given year, computed in Postgres.
+
+    :param year_filter: Year to filter the payment data (default: 2005)
+    :return: pandas DataFrame with columns first_name, last_name, total_revenue
+    """
+    return run_query(ACTOR_REVENUE_SQL, {"year_filter": year_filter})
+
+
+def top_movie_each_month(release_year=None):
+    """
+    Film with the highest total revenue for each (year, month), computed in Postgres.
+
+    :param release_year: Optionally filter by a specific year (default: None, all years)
+    :return: pandas DataFrame with columns year, month, film_name, total_revenue
+    """
+    return run_query(TOP_MOVIE_SQL, {"release_year": release_year})
+
+
+def assert_results_equal(spark_result, postgres_result, sort_by):
+    """
+    Checks that a Spark result and a Postgres result hold the same rows.
+
+    Both sides are sorted by `sort_by` and the remaining (numeric) columns are
+    compared as float, since Spark and Postgres may pick different decimal precisions.
+
+    :param spark_result: Spark DataFrame
+    :param postgres_result: pandas DataFrame
+    :param sort_by: Columns that uniquely order the rows
+    :raises AssertionError: If the results differ
+    """
+    def normalize(pdf):
+        pdf = pdf.sort_values(sort_by).reset_index(drop=True)
+        for column in pdf.columns:
+            if column not in sort_by:
+                pdf[column] = pdf[column].astype('float64')
+        return pdf
+
+    # Imported here so the Postgres path does not need pyspark installed
+    from utils.export import collect_pandas
+    pd.testing.assert_frame_equal(
+        normalize(collect_pandas(spark_result)),
+        normalize(postgres_result[list(spark_result.columns)]),
+        check_dtype=False,
+    )
@@ -0,0 +1,205 @@
+import json
+import os
+import time
+import uuid
+import urllib.request
+from datetime import datetime
+
+from utils.spark_session import job_group
+
+
+# Metrics compared against the baseline when looking for regressions
+REGRESSION_METRICS = [
+    'wall_time_s',
+    'shuffle_read_bytes',
+    'shuffle_write_bytes',
+    'memory_bytes_spilled',
+    'disk_bytes_spilled',
+]
+DEFAULT_TOLERANCE = 0.2
+
+
+def physical_plan(df):
+    """
+    Returns the formatted physical plan of a Spark DataFrame as a string.
+    """
+    jvm = df.sparkSession.sparkContext._jvm
+    return jvm.PythonSQLUtils.explainString(df._jdf.queryExecution(), 'formatted')
+
+
+def _rest_stage(spark, stage_id, retries=5, delay=0.2):
+    """
+    Fetches stage metrics from the Spark UI REST API.
+
+    The listener bus is asynchronous, so the stage may briefly be missing or
+    still reported as active right after the job returns.
+    """
+    sc = spark.sparkContext
+    if not sc.uiWebUrl:
+        return None
+    url = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}/stages/{stage_id}"
+    for _ in range(retries):
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                attempts = json.load(response)
+            if attempts and attempts[0].get('status') != 'ACTIVE':
+                return attempts[0]
+        except OSError:
+            pass
+        time.sleep(delay)
+    return None
+
+
+def collect_job_group_metrics(spark, job_group):
+    """
+    Aggregates job, stage, task, shuffle, spill and input metrics for a job group.
+
+    Task and stage counts come from the status tracker; byte and record counts
+    come from the REST API when the Spark UI is enabled.
+
+    :param spark: SparkSession object
+    :param job_group: Job group id set with setJobGroup
+    :return: Dict of metrics
+    """
+    tracker = spark.sparkContext.statusTracker()
+    job_ids = tracker.getJobIdsForGroup(job_group)
+    stage_ids = set()
+    for job_id in job_ids:
+        info = tracker.getJobInfo(job_id)
+        if info is not None:
+            stage_ids.update(info.stageIds)
+
+    metrics = {
+        'jobs': len(job_ids),
+        'stages': len(stage_ids),
+        'tasks': 0,
+        'failed_tasks': 0,
+        'shuffle_read_bytes': 0,
+        'shuffle_write_bytes': 0,
+        'memory_bytes_spilled': 0,
+        'disk_bytes_spilled': 0,
+        'jdbc_rows_fetched': 0,
+    }
+    for stage_id in stage_ids:
+        rest = _rest_stage(spark, stage_id)
+        if rest is not None:
+            metrics['tasks'] += rest.get('numTasks', 0)
+            metrics['failed_tasks'] += rest.get('numFailedTasks', 0)
+            metrics['shuffle_read_bytes'] += rest.get('shuffleReadBytes', 0)
+            metrics['shuffle_write_bytes'] += rest.get('shuffleWriteBytes', 0)
+            metrics['memory_bytes_spilled'] += rest.get('memoryBytesSpilled', 0)
+            metrics['disk_bytes_spilled'] += rest.get('diskBytesSpilled', 0)
+            # Every source in these analyses is a JDBC scan, so input records are rows fetched
+            metrics['jdbc_rows_fetched'] += rest.get('inputRecords', 0)
+            continue
+        info = tracker.getStageInfo(stage_id)
+        if info is not None:
+            metrics['tasks'] += info.numTasks
+            metrics['failed_tasks'] += info.numFailedTasks
+    return metrics
+
+
+class AnalysisProfiler:
+    """
+    Wraps analyses, records per-analysis Spark metrics and writes a JSON run report.
+
+    Spark results are materialized with the no-op writer so the whole plan runs
+    without collecting rows to the driver. Every job started during the call,
+    including those of a session created lazily inside the analysis, is tagged
+    with the analysis' job group. Analyses should be run without interactive
+    side effects (e.g. plot=False), since those count towards wall time.
+    Results from the Postgres engine only get wall time and row counts.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.now().isoformat()
+        self.analyses = {}
+
+    def run(self, name, analysis, *args, **kwargs):
+        """
+        Runs an analysis and records its metrics under `name`.
+
+        :return: Whatever the analysis returns
+        """
+        if not self.enabled:
+            return analysis(*args, **kwargs)
+
+        group_id = f"{name}-{self.run_id}"
+        entry = {}
+        with job_group(group_id, name):
+            start = time.perf_counter()
+            result = analysis(*args, **kwargs)
+            if hasattr(result, 'sparkSession'):
+                entry['engine'] = 'spark'
+                entry['physical_plan'] = physical_plan(result)
+                result.write.format('noop').mode('overwrite').save()
+            entry['wall_time_s'] = time.perf_counter() - start
+
+        if entry.get('engine') == 'spark':
+            entry.update(collect_job_group_metrics(result.sparkSession, group_id))
+        else:
+            entry['engine'] = 'postgres'
+            entry['rows'] = len(result)
+
+        self.analyses[name] = entry
+        return result
+
+    def report(self):
+        """
+        Returns the run report as a dict.
+        """
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'analyses': self.analyses,
+        }
+
+    def write_report(self, path):
+        """
+        Writes the run report as JSON.
+
+        :param path: Output file path
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def find_regressions(self, baseline_path, tolerance=DEFAULT_TOLERANCE):
+        """
+        Compares this run against a stored baseline report.
+
+        A metric regresses when it exceeds the baseline value by more than
+        `tolerance` (a fraction, 0.2 = 20%). Analyses that switched engine are
+        not compared.
+
+        :param baseline_path: Path of a previously written run report
+        :param tolerance: Allowed relative increase
+        :return: List of dicts describing each regression
+        """
+        if not os.path.exists(baseline_path):
+            return []
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)['analyses']
+
+        regressions = []
+        for name, current in self.analyses.items():
+            previous = baseline.get(name)
+            if previous is None or previous.get('engine') != current.get('engine'):
+                continue
+            for metric in REGRESSION_METRICS:
+                before, after = previous.get(metric), current.get(metric)
+                if not before or after is None:
+                    continue
+                if after > before * (1 + tolerance):
+                    regressions.append({
+                        'analysis': name,
+                        'metric': metric,
+                        'baseline': before,
+                        'current': after,
+                        'change': after / before - 1,
+                    })
+        return regressions
@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+
+from pyspark.sql import SparkSession
+from utils.config import get_config
+
+
+# Named performance profiles. Values set in config.yaml under
+# pyspark.PROFILES.<name> override the defaults below key by key.
+DEFAULT_PROFILE = 'local-small'
+
+PROFILES = {
+    'local-small': {
+        'master': 'local[2]',
+        'shuffle_partitions': 4,
+        'arrow': True,
+        'kryo': True,
+        'aqe': True,
+        'driver_memory': '1g',
+    },
+    'local-large': {
+        'master': 'local[*]',
+        'shuffle_partitions': 64,
+        'arrow': True,
+        'kryo': True,
+        'aqe': True,
+        'driver_memory': '4g',
+    },
+    'cluster': {
+        'master': None,
+        'shuffle_partitions': 200,
+        'arrow': True,
+        'kryo': True,
+        'aqe': True,
+        'driver_memory': '8g',
+    },
+}
+
+_spark = None
+# Job group applied to the session as soon as it exists (see job_group)
+_job_group = None
+
+
+def get_profile(name=None):
+    """
+    Resolves a performance profile, merging config.yaml overrides over the defaults.
+
+    :param name: Profile name (default: pyspark.PROFILE from config.yaml, else 'local-small')
+    :return: Dict of profile settings
+    """
+    conf = get_config()
+    pyspark_conf = conf.get('pyspark') or {}
+    name = name or pyspark_conf.get('PROFILE') or DEFAULT_PROFILE
+
+    overrides = (pyspark_conf.get('PROFILES') or {}).get(name) or {}
+    if name not in PROFILES and not overrides:
+        raise ValueError(f"Unknown Spark profile '{name}', expected one of {sorted(PROFILES)}")
+
+    profile = dict(PROFILES.get(name, PROFILES[DEFAULT_PROFILE]))
+    profile.update({key.lower(): value for key, value in overrides.items()})
+    profile['name'] = name
+    return profile
+
+
+def build_spark_session(profile=None, app_name='movie_rental_analysis'):
+    """
+    Builds a SparkSession tuned by the given performance profile.
+
+    :param profile: Profile name (see PROFILES)
+    :param app_name: Spark application name
+    :return: SparkSession object
+    """
+    conf = get_config()
+    settings = get_profile(profile)
+
+    builder = SparkSession.builder.appName(app_name) \
+        .config('spark.jars', conf['pyspark']['JDBC_DRIVER_PATH']) \
+        .config('spark.sql.shuffle.partitions', str(settings['shuffle_partitions'])) \
+        .config('spark.sql.execution.arrow.pyspark.enabled', str(settings['arrow']).lower()) \
+        .config('spark.sql.execution.arrow.pyspark.fallback.enabled', 'true') \
+        .config('spark.sql.adaptive.enabled', str(settings['aqe']).lower()) \
+        .config('spark.sql.adaptive.coalescePartitions.enabled', str(settings['aqe']).lower()) \
+        .config('spark.driver.memory', settings['driver_memory'])
+
+    if settings['kryo']:
+        builder = builder.config('spark.serializer', 'org.apache.spark.serializer.KryoSerializer')
+    if settings.get('master'):
+        builder = builder.master(settings['master'])
+
+    return builder.getOrCreate()
+
+
+def get_spark(profile=None):
+    """
+    Returns the process-wide SparkSession, creating it on first use.
+
+    Importing the analysis modules does not start a JVM; the session is only
+    built the first time this function is called.
+
+    :param profile: Profile name used if the session has not been created yet
+    :return: SparkSession object
+    """
+    global _spark
+    if _spark is None:
+        _spark = build_spark_session(profile)
+        if _job_group is not None:
+            _spark.sparkContext.setJobGroup(*_job_group)
+    return _spark
+
+
+def _current_session():
+    return _spark or SparkSession.getActiveSession()
+
+
+@contextmanager
+def job_group(group_id, description):
+    """
+    Tags every Spark job started inside the block with a job group.
+
+    The group is applied immediately if a session exists, otherwise as soon as
+    get_spark() creates one, so jobs of a lazily started session are included.
+
+    :param group_id: Job group id
+    :param description: Job group description
+    """
+    global _job_group
+    _job_group = (group_id, description)
+    spark = _current_session()
+    if spark is not None:
+        spark.sparkContext.setJobGroup(group_id, description)
+    try:
+        yield
+    finally:
+        _job_group = None
+        spark = _current_session()
+        if spark is not None:
+            spark.sparkContext.setLocalProperty('spark.jobGroup.id', None)
+
+
+def stop_spark():
+    """
+    Stops the process-wide SparkSession if one was created.
+    """
+    global _spark
+    if _spark is not None:
+        _spark.stop()
+        _spark = None
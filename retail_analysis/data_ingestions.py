@@ -1,6 +1,8 @@
 from utils.Connection import create_connection
+from instrumentation import instrument_stage, record_stage, write_prometheus
 import pandas as pd
 
+@instrument_stage('retail', 'ingest_data')
 def ingest_data(chunk_size=1000):
     engine = create_connection()
     
@@ -9,6 +11,7 @@ def ingest_data(chunk_size=1000):
     
     # Convert all column names to lowercase prevent the "table_name" issue
     df.columns = df.columns.str.lower()
+    record_stage(rows_in=len(df), bytes_in=int(df.memory_usage(index=True).sum()))
     
  
     num_chunks = len(df) // chunk_size + (1 if len(df) % chunk_size != 0 else 0)
@@ -28,4 +31,7 @@ def ingest_data(chunk_size=1000):
         
         print(f"Chunk {i+1}/{num_chunks} processed")
 
-ingest_data()
\ No newline at end of file
+    record_stage(rows_out=len(df))
+
+ingest_data()
+write_prometheus()
\ No newline at end of file
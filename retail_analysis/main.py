@@ -1,8 +1,10 @@
 from utils.Connection import create_connection
+from instrumentation import instrument_stage, write_prometheus
 import pandas as pd
 import matplotlib.pyplot as plt
 
 # Function to fetch number of sales per customer
+@instrument_stage('retail', 'fetch_sales_per_customer')
 def fetch_sales_per_customer():
     engine = create_connection()
 
@@ -27,6 +29,7 @@ def fetch_sales_per_customer():
     return df
 
 # Function to fetch total sales by year and month
+@instrument_stage('retail', 'fetch_sales_by_year_month')
 def fetch_sales_by_year_month():
     engine = create_connection()
 
@@ -48,6 +51,7 @@ def fetch_sales_by_year_month():
     return df
 
 # Function to fetch best 10 sold products by Quantity
+@instrument_stage('retail', 'fetch_best_10_sold_products')
 def fetch_best_10_sold_products():
     engine = create_connection()
 
@@ -70,6 +74,7 @@ def fetch_best_10_sold_products():
     return df
 
 # Function to fetch worst 10 sold products by Quantity
+@instrument_stage('retail', 'fetch_worst_10_sold_products')
 def fetch_worst_10_sold_products():
     engine = create_connection()
 
@@ -92,6 +97,7 @@ def fetch_worst_10_sold_products():
     return df
 
 # Function to fetch best 5 sales by country
+@instrument_stage('retail', 'fetch_best_sales_by_country')
 def fetch_best_sales_by_country():
     engine = create_connection()
 
@@ -189,4 +195,7 @@ if __name__ == "__main__":
     plot_worst_sold_products(worst_10_sold_products)
     plot_best_sales_by_country(best_sales_by_country)
 
+    # Export stage metrics (PIPELINE_METRICS_PROM) for this run
+    write_prometheus()
+
 